@@ -7,9 +7,34 @@ Run with:
 Docs available at:
     http://localhost:8000/docs
 """
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routes import router
+from fastapi.responses import ORJSONResponse, Response
+import orjson
+from .routes import router, warm_engine
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # CadQuery/OCC booleans are CPU-bound and hold the GIL, so enclosure
+    # generation runs in worker processes instead of the request threadpool.
+    # Spawned rather than forked, so workers never inherit this process's
+    # threads or locks; each one imports CadQuery once as it starts.
+    app.state.cad_pool = ProcessPoolExecutor(
+        max_workers=os.cpu_count(),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=warm_engine,
+    )
+    try:
+        yield
+    finally:
+        app.state.cad_pool.shutdown(cancel_futures=True)
+
 
 app = FastAPI(
     title="ShellForge API",
@@ -17,6 +42,8 @@ app = FastAPI(
     version="0.1.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # Allow frontend (React on port 5173) to talk to the API
@@ -31,10 +58,14 @@ app.add_middleware(
 app.include_router(router, prefix="/api/v1")
 
 
+# Static body, encoded once
+_ROOT_JSON = orjson.dumps({
+    "name": "ShellForge API",
+    "version": "0.1.0",
+    "docs": "/docs",
+})
+
+
 @app.get("/")
 def root():
-    return {
-        "name": "ShellForge API",
-        "version": "0.1.0",
-        "docs": "/docs",
-    }
+    return Response(content=_ROOT_JSON, media_type="application/json")
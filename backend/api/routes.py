@@ -1,42 +1,106 @@
 """
 ShellForge API - Route handlers.
 """
-import uuid
-import shutil
+import asyncio
+import contextlib
+import hashlib
+import secrets
 import os
+import shutil
 import json
+import logging
 from pathlib import Path
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from fastapi.responses import FileResponse
-
-from .schemas import EnclosureRequestSchema, EnclosureResponseSchema
+import aiofiles
+import orjson
+from fastapi import APIRouter, HTTPException, Request, UploadFile, File
+from fastapi.responses import FileResponse, Response
+
+# Imported once at worker startup rather than inside the request handler
+try:
+    import trimesh
+except ImportError:  # STL import is unavailable without trimesh
+    trimesh = None
+
+from .schemas import (
+    EnclosureRequestSchema, EnclosureResponseSchema,
+    LidStyleSchema, WallFaceSchema, CustomCutoutShapeSchema, PartNameSchema,
+)
 from ..engine.models import (
     EnclosureConfig, ConnectorCutout, CustomCutout,
     LidStyle, WallFace, ConnectorType, CustomCutoutShape, PartConfig,
-    FootprintConfig
+    FootprintConfig, EnclosureResult
 )
-from ..engine.bbox_only import generate_from_manual_bbox
-from ..engine.wrapper import generate_wrapper_enclosure
-from ..connectors.profiles import list_connectors
+from ..connectors.profiles import list_connectors_json
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Root of everything the API writes to disk
+OUTPUT_ROOT = Path("./output")
 
 # Temp output directory for generated files
-OUTPUT_BASE = Path("./output/jobs")
+OUTPUT_BASE = OUTPUT_ROOT / "jobs"
 OUTPUT_BASE.mkdir(parents=True, exist_ok=True)
 
 # Import directory for uploaded models
-IMPORTS_DIR = Path("./output/imports")
+IMPORTS_DIR = OUTPUT_ROOT / "imports"
 IMPORTS_DIR.mkdir(parents=True, exist_ok=True)
 
+# Uploads are copied to disk in chunks of this size (bytes)
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Largest accepted model upload (bytes)
+MAX_UPLOAD_SIZE = 200 * 1024 * 1024
+
 # Component library path
 LIBRARY_PATH = Path(__file__).parent.parent / "library" / "components.json"
 
+# Schema enum value -> engine enum, built once instead of per request
+_WALL_FACES = {m.value: WallFace(m.value) for m in WallFaceSchema}
+_CUTOUT_SHAPES = {m.value: CustomCutoutShape(m.value) for m in CustomCutoutShapeSchema}
+_LID_STYLES = {m.value: LidStyle(m.value) for m in LidStyleSchema}
+_CONNECTOR_TYPES = {m.value: m for m in ConnectorType}
+
+# Engine result key -> download route suffix under /download/{job_id}/
+_DOWNLOAD_ROUTES = {
+    "base": "base",
+    "base_3mf": "base/3mf",
+    "lid": "lid",
+    "lid_3mf": "lid/3mf",
+    "tray": "tray",
+    "bracket": "bracket",
+}
+
+# When running behind nginx, set this to an internal location that aliases
+# ./output/ (e.g. "/internal") and file transfers are handed off to nginx
+# via X-Accel-Redirect instead of being streamed by the API worker.
+ACCEL_REDIRECT_PREFIX = os.environ.get("SHELLFORGE_ACCEL_REDIRECT", "").rstrip("/")
+
+
+def _send_file(path: Path, media_type: str, filename: str = None, headers: dict = None):
+    """
+    Return a file response, offloading the transfer to nginx when configured.
+    FileResponse sends the file in chunks off the event loop and handles
+    ETag / Last-Modified, HEAD and Range requests (206) on its own.
+    """
+    headers = dict(headers or {})
+    if not ACCEL_REDIRECT_PREFIX:
+        return FileResponse(path=str(path), media_type=media_type, filename=filename, headers=headers)
+
+    headers["X-Accel-Redirect"] = f"{ACCEL_REDIRECT_PREFIX}/{path.relative_to(OUTPUT_ROOT).as_posix()}"
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return Response(media_type=media_type, headers=headers)
+
 
 @router.get("/connectors", summary="List available connector types")
 def get_connectors():
     """Returns all supported connector cutout profiles."""
-    return {"connectors": list_connectors()}
+    return Response(
+        content=list_connectors_json(),
+        media_type="application/json",
+        headers={"Cache-Control": "public, max-age=86400"},
+    )
 
 
 @router.get("/library/search", summary="Search component library")
@@ -84,8 +148,31 @@ def get_component(component_id: str):
     raise HTTPException(status_code=404, detail="Component not found")
 
 
+def _process_import(upload_path: Path, ext: str, stl_out: Path) -> tuple:
+    """
+    Compute the bbox of an uploaded model and write its preview STL.
+    STL uploads are stored directly as the preview, so there is nothing to write.
+    Blocking (trimesh / CadQuery) — run it off the event loop.
+    Returns (width, depth, height).
+    """
+    if ext == ".stl":
+        if trimesh is None:
+            raise RuntimeError("trimesh is not installed")
+        mesh = trimesh.load(str(upload_path), force="mesh")
+        bbox = mesh.bounding_box.extents  # [x, y, z] extents
+        return float(bbox[0]), float(bbox[1]), float(bbox[2])
+
+    # STEP — load with CadQuery
+    import cadquery as cq
+
+    result = cq.importers.importStep(str(upload_path))
+    bb = result.val().BoundingBox()
+    cq.exporters.export(result, str(stl_out))
+    return float(bb.xmax - bb.xmin), float(bb.ymax - bb.ymin), float(bb.zmax - bb.zmin)
+
+
 @router.post("/import", summary="Import STL or STEP file")
-async def import_model(file: UploadFile = File(...)):
+async def import_model(request: Request, file: UploadFile = File(...)):
     """
     Accept an STL or STEP file upload.
     - STL: compute bbox with trimesh, serve the file as-is
@@ -98,61 +185,77 @@ async def import_model(file: UploadFile = File(...)):
     if ext not in (".stl", ".step", ".stp"):
         raise HTTPException(status_code=400, detail="Only .stl, .step, .stp files supported")
 
-    job_id = str(uuid.uuid4())[:8]
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"File too large (max {MAX_UPLOAD_SIZE // (1024 * 1024)} MB)",
+    )
+    try:
+        content_length = int(request.headers.get("content-length", "0"))
+    except ValueError:
+        content_length = 0
+    if content_length > MAX_UPLOAD_SIZE:
+        raise too_large
+
+    # Stream the upload to a temp file, hashing it as we go. Imports are
+    # content-addressed: identical bytes map to the same job directory.
+    tmp_path = IMPORTS_DIR / f".upload-{secrets.token_hex(8)}{ext}"
+    digest = hashlib.sha256()
+    written = 0
+    async with aiofiles.open(tmp_path, "wb") as f:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            written += len(chunk)
+            if written > MAX_UPLOAD_SIZE:
+                break
+            digest.update(chunk)
+            await f.write(chunk)
+    if written > MAX_UPLOAD_SIZE:
+        # Content-Length can be absent or wrong, so enforce the cap on what was read
+        tmp_path.unlink()
+        raise too_large
+
+    job_id = digest.hexdigest()[:16]
     job_dir = IMPORTS_DIR / job_id
-    job_dir.mkdir(parents=True, exist_ok=True)
-
-    # Save uploaded file
-    upload_path = job_dir / f"original{ext}"
-    content = await file.read()
-    with open(upload_path, "wb") as f:
-        f.write(content)
-
+    meta_path = job_dir / "meta.json"
     name = Path(filename).stem
-    stl_out = job_dir / "model.stl"
 
-    try:
-        if ext == ".stl":
-            import trimesh
-            mesh = trimesh.load(str(upload_path), force="mesh")
-            bbox = mesh.bounding_box.extents  # [x, y, z] extents
-            width = float(bbox[0])
-            depth = float(bbox[1])
-            height = float(bbox[2])
-            # Copy as-is for preview
-            shutil.copy(str(upload_path), str(stl_out))
-
-        else:
-            # STEP — load with CadQuery
-            import cadquery as cq
-            result = cq.importers.importStep(str(upload_path))
-            bb = result.val().BoundingBox()
-            width = float(bb.xmax - bb.xmin)
-            depth = float(bb.ymax - bb.ymin)
-            height = float(bb.zmax - bb.zmin)
-            cq.exporters.export(result, str(stl_out))
+    if meta_path.exists():
+        # Already imported — reuse the stored bbox and preview STL
+        tmp_path.unlink()
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    else:
+        job_dir.mkdir(parents=True, exist_ok=True)
+        stl_out = job_dir / "model.stl"
+        # STL is served as-is for preview, so it goes straight to model.stl
+        upload_path = stl_out if ext == ".stl" else job_dir / f"original{ext}"
+        os.replace(tmp_path, upload_path)
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to process file: {str(e)}")
+        try:
+            width, depth, height = await asyncio.to_thread(_process_import, upload_path, ext, stl_out)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to process file: {str(e)}")
+
+        meta = {"width": round(width, 2), "depth": round(depth, 2), "height": round(height, 2)}
+        # Written last: its presence marks the import as complete
+        meta_path.write_text(json.dumps(meta), encoding="utf-8")
 
     return {
         "name": name,
-        "width": round(width, 2),
-        "depth": round(depth, 2),
-        "height": round(height, 2),
+        "width": meta["width"],
+        "depth": meta["depth"],
+        "height": meta["height"],
         "stl_url": f"http://localhost:8000/api/v1/model/{job_id}",
         "job_id": job_id,
     }
 
 
-@router.get("/model/{job_id}", summary="Serve imported model STL for preview")
+@router.api_route("/model/{job_id}", methods=["GET", "HEAD"], summary="Serve imported model STL for preview")
 def get_model_stl(job_id: str):
     """Serve the STL file for a given import job."""
     stl_path = IMPORTS_DIR / job_id / "model.stl"
     if not stl_path.exists():
         raise HTTPException(status_code=404, detail="Model not found")
-    return FileResponse(
-        path=str(stl_path),
+    return _send_file(
+        stl_path,
         media_type="model/stl",
         headers={"Access-Control-Allow-Origin": "*"},
     )
@@ -203,49 +306,139 @@ def _find_holes(step_path: Path, min_r: float, max_r: float) -> list:
         from OCP.GeomAbs import GeomAbs_Cylinder
 
         shape = cq.importers.importStep(str(step_path))
-        holes = []
+
+        # Gather face handles first, then only inspect the cylindrical ones
+        faces = []
         explorer = TopExp_Explorer(shape.val().wrapped, TopAbs_FACE)
         while explorer.More():
-            face = explorer.Current()
-            surf = BRep_Tool.Surface_s(face)
-            if surf.GetType() == GeomAbs_Cylinder:
-                cyl = surf.Cylinder()
-                r = cyl.Radius()
-                if min_r <= r <= max_r:
-                    ax = cyl.Axis()
-                    loc = ax.Location()
-                    holes.append({
-                        "x": round(loc.X(), 2),
-                        "y": round(loc.Y(), 2),
-                        "diameter": round(r * 2, 2),
-                    })
+            faces.append(explorer.Current())
             explorer.Next()
+        surfaces = [BRep_Tool.Surface_s(face) for face in faces]
+        cylinders = [surf.Cylinder() for surf in surfaces if surf.GetType() == GeomAbs_Cylinder]
 
-        # Deduplicate
+        # Deduplicate on the fly (a hole's faces share the same axis location)
         seen = set()
-        unique = []
-        for h in holes:
-            key = (round(h["x"], 1), round(h["y"], 1))
-            if key not in seen:
-                seen.add(key)
-                unique.append(h)
-        return unique
+        holes = []
+        for cyl in cylinders:
+            r = cyl.Radius()
+            if not (min_r <= r <= max_r):
+                continue
+            loc = cyl.Axis().Location()
+            x, y = loc.X(), loc.Y()
+            key = (round(x, 1), round(y, 1))
+            if key in seen:
+                continue
+            seen.add(key)
+            holes.append({
+                "x": round(x, 2),
+                "y": round(y, 2),
+                "diameter": round(r * 2, 2),
+            })
+        return holes
 
     except ImportError:
         # OCP not available — return empty result
         return []
 
 
+def _schema_to_part(ps) -> PartConfig:
+    """Convert a validated PartConfigSchema into the engine's PartConfig."""
+    return PartConfig(
+        style=ps.style,
+        fillet_radius=ps.fillet_radius,
+        wall_thickness=ps.wall_thickness,
+        lid_hole_style=ps.lid_hole_style,
+        tray_z=ps.tray_z,
+        tray_thickness=ps.tray_thickness,
+        bracket_hole_diameter=ps.bracket_hole_diameter,
+        enabled=ps.enabled,
+        edge_style=ps.edge_style,
+        chamfer_size=ps.chamfer_size,
+    )
+
+
+def warm_engine() -> None:
+    """
+    Import the CAD engines (cadquery/OCP take a couple of seconds). The CAD
+    process pool's initializer, so each worker loads them once as it starts
+    while the API process itself never does.
+    """
+    from ..engine import bbox_only, wrapper  # noqa: F401
+
+
+def engine_digest() -> bytes:
+    """
+    The engine's source digest (generator._engine_digest). Runs in the CAD
+    process pool, so the API process never has to import the engine itself.
+    """
+    from ..engine.generator import _engine_digest
+    return _engine_digest()
+
+
+async def _job_id(request_json: bytes, app) -> str:
+    """Job id of a /generate request: a hash of its body and of the engine code that serves it."""
+    digest = getattr(app.state, "engine_digest", None)
+    if digest is None:
+        digest = await asyncio.get_running_loop().run_in_executor(app.state.cad_pool, engine_digest)
+        app.state.engine_digest = digest
+    return hashlib.sha256(digest + request_json).hexdigest()[:12]
+
+
+def _read_manifest(manifest_path: Path):
+    """A finished job's manifest, or None if the job hasn't completed."""
+    try:
+        return json.loads(manifest_path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def _run_engine(components_bbox: list, config: EnclosureConfig, output_dir: str) -> EnclosureResult:
+    """
+    Generate with the wrapper engine (true geometric fit), falling back to bbox_only.
+    Runs inside the CAD process pool, so it must stay a picklable module-level function.
+    """
+    from ..engine.bbox_only import generate_from_manual_bbox
+    from ..engine.wrapper import generate_wrapper_enclosure
+
+    try:
+        return generate_wrapper_enclosure(
+            components_spec=components_bbox,
+            config=config,
+            output_dir=output_dir,
+        )
+    except Exception as e:
+        logger.warning("Wrapper engine failed (%s), falling back to bbox_only", e)
+        return generate_from_manual_bbox(
+            components_bbox=components_bbox,
+            config=config,
+            output_dir=output_dir,
+        )
+
+
 @router.post("/generate", response_model=EnclosureResponseSchema, summary="Generate enclosure")
-def generate_enclosure(request: EnclosureRequestSchema):
+async def generate_enclosure(request: EnclosureRequestSchema, http_request: Request):
     """
     Generate a 3D printable enclosure from component dimensions.
 
     Returns download links for the base and lid STL files.
+    Identical requests share a job: the job id is a hash of the request body
+    and the engine code, and a finished job's manifest is returned without
+    regenerating.
     """
-    job_id = str(uuid.uuid4())[:8]
+    request_json = orjson.dumps(request.model_dump(mode="json"), option=orjson.OPT_SORT_KEYS)
+    job_id = await _job_id(request_json, http_request.app)
     job_dir = OUTPUT_BASE / job_id
-    job_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = job_dir / "job.json"
+
+    manifest = _read_manifest(manifest_path)
+    if manifest is not None:
+        return EnclosureResponseSchema(
+            success=True,
+            message="Enclosure generated successfully",
+            job_id=job_id,
+            files=manifest["files"],
+            dimensions=manifest["dimensions"],
+        )
 
     # Build components list
     components_bbox = [
@@ -266,53 +459,41 @@ def generate_enclosure(request: EnclosureRequestSchema):
         for c in request.components
     ]
 
-    # Build cutouts list
+    # Build cutouts list. Faces and shapes were already validated as schema
+    # enums on ingress, so they map straight across via the lookup tables.
     cutouts = []
     for co in request.cutouts:
-        try:
-            cutouts.append(ConnectorCutout(
-                connector_type=ConnectorType(co.connector_type),
-                face=WallFace(co.face.value),
-                offset_x=co.offset_x,
-                offset_y=co.offset_y,
-                custom_width=co.custom_width,
-                custom_height=co.custom_height,
-            ))
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=f"Invalid connector/face: {e}")
+        connector_type = _CONNECTOR_TYPES.get(co.connector_type)
+        if connector_type is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid connector/face: {co.connector_type!r} is not a valid ConnectorType",
+            )
+        cutouts.append(ConnectorCutout(
+            connector_type=connector_type,
+            face=_WALL_FACES[co.face.value],
+            offset_x=co.offset_x,
+            offset_y=co.offset_y,
+            custom_width=co.custom_width,
+            custom_height=co.custom_height,
+        ))
 
     # Build custom cutouts list
-    custom_cutouts = []
-    for cc in request.custom_cutouts:
-        try:
-            custom_cutouts.append(CustomCutout(
-                shape=CustomCutoutShape(cc.shape.value),
-                face=WallFace(cc.face.value),
-                width=cc.width,
-                height=cc.height,
-                depth=cc.depth,
-                offset_x=cc.offset_x,
-                offset_y=cc.offset_y,
-                rotation=cc.rotation,
-            ))
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=f"Invalid custom cutout: {e}")
-
-    # Build per-part configs
-    def _schema_to_part(ps) -> PartConfig:
-        return PartConfig(
-            style=ps.style,
-            fillet_radius=ps.fillet_radius,
-            wall_thickness=ps.wall_thickness,
-            lid_hole_style=ps.lid_hole_style,
-            tray_z=ps.tray_z,
-            tray_thickness=ps.tray_thickness,
-            bracket_hole_diameter=ps.bracket_hole_diameter,
-            enabled=ps.enabled,
-            edge_style=ps.edge_style,
-            chamfer_size=ps.chamfer_size,
+    custom_cutouts = [
+        CustomCutout(
+            shape=_CUTOUT_SHAPES[cc.shape.value],
+            face=_WALL_FACES[cc.face.value],
+            width=cc.width,
+            height=cc.height,
+            depth=cc.depth,
+            offset_x=cc.offset_x,
+            offset_y=cc.offset_y,
+            rotation=cc.rotation,
         )
+        for cc in request.custom_cutouts
+    ]
 
+    # Build per-part configs
     parts_config = {
         "base": _schema_to_part(request.parts.base),
         "lid": _schema_to_part(request.parts.lid),
@@ -345,113 +526,111 @@ def generate_enclosure(request: EnclosureRequestSchema):
         wall_thickness=request.wall_thickness,
         floor_thickness=request.floor_thickness,
         lid_thickness=request.lid_thickness,
-        lid_style=LidStyle(request.lid_style.value),
+        lid_style=_LID_STYLES[request.lid_style.value],
         fillet_radius=request.fillet_radius,
         screw_diameter=request.screw_diameter,
         screw_length=request.screw_length,
         lid_hole_style=request.lid_hole_style,
         enclosure_style=request.enclosure_style,
         pcb_standoffs_enabled=request.pcb_standoffs_enabled,
+        export_tolerance=request.export_tolerance,
+        export_angular_tolerance=request.export_angular_tolerance,
         footprint=footprint_config,
         parts=parts_config,
         cutouts=cutouts,
         custom_cutouts=custom_cutouts,
     )
 
-    # Generate — use wrapper engine (true geometric fit) with bbox fallback
+    # Generate in the CAD process pool so OCC work doesn't hold this worker.
+    # Each request builds in its own temp directory, so identical requests
+    # running at once never write over each other's files.
+    tmp_dir = OUTPUT_BASE / f".job-{job_id}-{secrets.token_hex(8)}"
+    tmp_dir.mkdir(parents=True)
     try:
-        result = generate_wrapper_enclosure(
-            components_spec=components_bbox,
-            config=config,
-            output_dir=str(job_dir),
+        result = await asyncio.get_running_loop().run_in_executor(
+            http_request.app.state.cad_pool, _run_engine, components_bbox, config, str(tmp_dir),
         )
     except Exception as e:
-        print(f"[WARN] Wrapper engine failed ({e}), falling back to bbox_only")
-        try:
-            result = generate_from_manual_bbox(
-                components_bbox=components_bbox,
-                config=config,
-                output_dir=str(job_dir),
-            )
-        except Exception as e2:
-            raise HTTPException(status_code=500, detail=f"Engine error: {str(e2)}")
-
-    # Compute dimensions for response
-    all_x = [c["x"] - c["width"]/2 for c in components_bbox] + [c["x"] + c["width"]/2 for c in components_bbox]
-    all_y = [c["y"] - c["depth"]/2 for c in components_bbox] + [c["y"] + c["depth"]/2 for c in components_bbox]
-    all_z = [c.get("ground_z", c.get("z", 0)) for c in components_bbox] + [c.get("ground_z", c.get("z", 0)) + c["height"] for c in components_bbox]
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise HTTPException(status_code=500, detail=f"Engine error: {str(e)}")
 
-    inner_w = (max(all_x) - min(all_x)) + request.padding_x * 2
-    inner_d = (max(all_y) - min(all_y)) + request.padding_y * 2
-    inner_h = (max(all_z) - min(all_z)) + request.padding_z * 2
+    # Inner cavity dimensions as computed by the engine
+    inner_w, inner_d, inner_h = result.inner_bbox
     wall = request.wall_thickness
 
-    files = {}
-    if "base" in result:
-        files["base"] = f"/download/{job_id}/base"
-    if "base_3mf" in result:
-        files["base_3mf"] = f"/download/{job_id}/base/3mf"
-    if "lid" in result:
-        files["lid"] = f"/download/{job_id}/lid"
-    if "lid_3mf" in result:
-        files["lid_3mf"] = f"/download/{job_id}/lid/3mf"
-    if "tray" in result:
-        files["tray"] = f"/download/{job_id}/tray"
-    if "bracket" in result:
-        files["bracket"] = f"/download/{job_id}/bracket"
+    files = {
+        key: f"/download/{job_id}/{route}"
+        for key, route in _DOWNLOAD_ROUTES.items()
+        if key in result
+    }
+
+    dimensions = {
+        "inner": {"width": round(inner_w, 2), "depth": round(inner_d, 2), "height": round(inner_h, 2)},
+        "outer": {"width": round(inner_w + wall*2, 2), "depth": round(inner_d + wall*2, 2), "height": round(inner_h + request.floor_thickness, 2)},
+    }
+    # Written last, then the whole directory is renamed into place: job_dir
+    # only ever appears complete, manifest included. If an identical request
+    # finished first, its job is kept and this copy is dropped.
+    (tmp_dir / "job.json").write_text(json.dumps({"files": files, "dimensions": dimensions}), encoding="utf-8")
+    try:
+        os.replace(tmp_dir, job_dir)
+    except OSError:
+        if _read_manifest(manifest_path) is None:
+            # Left over from an interrupted run before jobs were built aside
+            shutil.rmtree(job_dir, ignore_errors=True)
+            with contextlib.suppress(OSError):
+                os.replace(tmp_dir, job_dir)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
 
     return EnclosureResponseSchema(
         success=True,
         message="Enclosure generated successfully",
         job_id=job_id,
         files=files,
-        dimensions={
-            "inner": {"width": round(inner_w, 2), "depth": round(inner_d, 2), "height": round(inner_h, 2)},
-            "outer": {"width": round(inner_w + wall*2, 2), "depth": round(inner_d + wall*2, 2), "height": round(inner_h + request.floor_thickness, 2)},
-        }
+        dimensions=dimensions,
     )
 
 
-@router.get("/download/{job_id}/{part}", summary="Download STL file")
-def download_stl(job_id: str, part: str):
+def _job_file(job_id: str, part: PartNameSchema, ext: str, not_found: str) -> Path:
+    """Resolve a generated part file for a job, raising 404 if it doesn't exist."""
+    file_path = OUTPUT_BASE / job_id / f"enclosure_{part.value}.{ext}"
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail=not_found)
+    return file_path
+
+
+@router.api_route("/download/{job_id}/{part}", methods=["GET", "HEAD"], summary="Download STL file")
+def download_stl(job_id: str, part: PartNameSchema):
     """
     Download generated STL file.
     - part: 'base', 'lid', 'tray', or 'bracket'
     """
-    if part not in ("base", "lid", "tray", "bracket"):
-        raise HTTPException(status_code=400, detail="part must be 'base', 'lid', 'tray', or 'bracket'")
-
-    file_path = OUTPUT_BASE / job_id / f"enclosure_{part}.stl"
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="File not found. Job may have expired.")
-
-    return FileResponse(
-        path=str(file_path),
+    file_path = _job_file(job_id, part, "stl", "File not found. Job may have expired.")
+    return _send_file(
+        file_path,
         media_type="application/octet-stream",
-        filename=f"shellforge_{part}.stl",
+        filename=f"shellforge_{part.value}.stl",
     )
 
 
-@router.get("/download/{job_id}/{part}/3mf", summary="Download 3MF file")
-def download_3mf(job_id: str, part: str):
+@router.api_route("/download/{job_id}/{part}/3mf", methods=["GET", "HEAD"], summary="Download 3MF file")
+def download_3mf(job_id: str, part: PartNameSchema):
     """
     Download generated 3MF file.
     - part: 'base', 'lid', 'tray', or 'bracket'
     """
-    if part not in ("base", "lid", "tray", "bracket"):
-        raise HTTPException(status_code=400, detail="part must be 'base', 'lid', 'tray', or 'bracket'")
-
-    file_path = OUTPUT_BASE / job_id / f"enclosure_{part}.3mf"
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="3MF file not found. May not be supported by this build.")
-
-    return FileResponse(
-        path=str(file_path),
+    file_path = _job_file(job_id, part, "3mf", "3MF file not found. May not be supported by this build.")
+    return _send_file(
+        file_path,
         media_type="application/vnd.ms-package.3dmanufacturing-3dmodel+xml",
-        filename=f"shellforge_{part}.3mf",
+        filename=f"shellforge_{part.value}.3mf",
     )
 
 
+# Static body, encoded once — this endpoint is polled by load balancers
+_HEALTH_JSON = orjson.dumps({"status": "ok", "service": "ShellForge API"})
+
+
 @router.get("/health", summary="Health check")
 def health():
-    return {"status": "ok", "service": "ShellForge API"}
+    return Response(content=_HEALTH_JSON, media_type="application/json")
@@ -2,7 +2,7 @@
 ShellForge API - Request/Response schemas (Pydantic models).
 These define exactly what JSON the frontend sends and what we return.
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional
 from enum import Enum
 
@@ -39,7 +39,20 @@ class FootprintShapeSchema(str, Enum):
     OCTAGON = "octagon"
 
 
-class ComponentManualSchema(BaseModel):
+class _Schema(BaseModel):
+    """Base for all API models: validated once on ingress, then read-only."""
+    # extra stays "ignore": the frontend sends client-side ids on cutouts
+    model_config = ConfigDict(frozen=True)
+
+
+class PartNameSchema(str, Enum):
+    BASE = "base"
+    LID = "lid"
+    TRAY = "tray"
+    BRACKET = "bracket"
+
+
+class ComponentManualSchema(_Schema):
     """A component defined by its dimensions (no 3D file needed)."""
     name: str = Field(..., example="ESP32 Dev Board")
     width: float = Field(..., gt=0, example=28.0, description="mm")
@@ -56,10 +69,10 @@ class ComponentManualSchema(BaseModel):
     is_pcb: bool = Field(False, description="Is this a PCB? Generates standoffs.")
     pcb_screw_diameter: float = Field(3.0, description="PCB screw hole diameter (mm)")
     ground_z: float = Field(0.0, description="Vertical offset from floor (mm)")
-    standoff_positions: list = Field(default_factory=list, description="[{x,y}] local coords")
+    standoff_positions: list[dict[str, float]] = Field(default_factory=list, description="[{x,y}] local coords")
 
 
-class ConnectorCutoutSchema(BaseModel):
+class ConnectorCutoutSchema(_Schema):
     """A connector hole to cut into a wall."""
     connector_type: str = Field(..., example="usb_c")
     face: WallFaceSchema = Field(..., example="front")
@@ -69,7 +82,7 @@ class ConnectorCutoutSchema(BaseModel):
     custom_height: Optional[float] = Field(None, description="Only for connector_type=custom")
 
 
-class CustomCutoutSchema(BaseModel):
+class CustomCutoutSchema(_Schema):
     """A custom-shaped hole in a wall."""
     shape: CustomCutoutShapeSchema = Field(..., example="rectangle")
     face: WallFaceSchema = Field(..., example="front")
@@ -81,7 +94,7 @@ class CustomCutoutSchema(BaseModel):
     rotation: float = Field(0.0, description="Rotation in degrees")
 
 
-class FootprintConfigSchema(BaseModel):
+class FootprintConfigSchema(_Schema):
     """Enclosure footprint (shape) configuration."""
     shape: FootprintShapeSchema = FootprintShapeSchema.RECTANGLE
     # L-shape
@@ -101,7 +114,7 @@ class FootprintConfigSchema(BaseModel):
     polygon_sides: int = Field(6, description="Sides for polygon shapes")
 
 
-class PartConfigSchema(BaseModel):
+class PartConfigSchema(_Schema):
     style: str = "classic"
     fillet_radius: float = 1.5
     wall_thickness: float = 2.5
@@ -114,14 +127,14 @@ class PartConfigSchema(BaseModel):
     chamfer_size: float = 1.5    # mm
 
 
-class PartsSchema(BaseModel):
+class PartsSchema(_Schema):
     base: PartConfigSchema = PartConfigSchema()
     lid: PartConfigSchema = PartConfigSchema()
     tray: PartConfigSchema = PartConfigSchema(enabled=False)
     bracket: PartConfigSchema = PartConfigSchema(enabled=False)
 
 
-class EnclosureRequestSchema(BaseModel):
+class EnclosureRequestSchema(_Schema):
     """Full request body to generate an enclosure."""
     components: list[ComponentManualSchema] = Field(
         ...,
@@ -156,6 +169,10 @@ class EnclosureRequestSchema(BaseModel):
     enclosure_style: str = Field("classic", description="classic | vented | rounded | ribbed | minimal")
     pcb_standoffs_enabled: bool = Field(True, description="Auto-generate PCB standoffs")
 
+    # Export mesh quality (coarser = faster export, smaller files)
+    export_tolerance: float = Field(0.1, ge=0.01, le=1.0, description="STL/3MF linear deflection (mm)")
+    export_angular_tolerance: float = Field(0.5, ge=0.05, le=1.5, description="STL/3MF angular deflection (rad)")
+
     # Footprint shape
     footprint: FootprintConfigSchema = FootprintConfigSchema()
 
@@ -163,15 +180,15 @@ class EnclosureRequestSchema(BaseModel):
     parts: PartsSchema = PartsSchema()
 
 
-class EnclosureResponseSchema(BaseModel):
+class EnclosureResponseSchema(_Schema):
     """Response after generating an enclosure."""
     success: bool
     message: str
     job_id: str
     files: dict  # { "base": "/download/abc123/base", "lid": "/download/abc123/lid" }
-    dimensions: dict  # { "inner": {...}, "outer": {...} }
-
+    # { "inner": {...}, "outer": {...} }, as reported by the engine that built
+    # the enclosure. For wrapper enclosures "inner" is the bounding box of the
+    # real cavity (the padded footprint union, rotations included), no longer
+    # the unrotated component bbox plus padding.
+    dimensions: dict
 
-class ConnectorListSchema(BaseModel):
-    """List of available connector types."""
-    connectors: list[dict]
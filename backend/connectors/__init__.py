@@ -1 +1 @@
-from .profiles import get_profile, list_connectors, CONNECTOR_PROFILES
+from .profiles import get_profile, list_connectors, list_connectors_json, CONNECTOR_PROFILES
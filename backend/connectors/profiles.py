@@ -2,6 +2,7 @@
 ShellForge - Standard connector cutout profiles (width x height in mm).
 All measurements include a small tolerance (0.3mm) for printability.
 """
+import json
 
 CONNECTOR_PROFILES = {
     "usb_a": {
@@ -64,9 +65,19 @@ def get_profile(connector_type: str) -> dict:
     return profile
 
 
+# CONNECTOR_PROFILES never changes at runtime, so the listing is built once.
+_CONNECTOR_LIST = tuple(
+    {"type": key, "label": val["label"]}
+    for key, val in CONNECTOR_PROFILES.items()
+)
+_CONNECTOR_LIST_JSON = json.dumps({"connectors": list(_CONNECTOR_LIST)}).encode("utf-8")
+
+
 def list_connectors() -> list:
     """List all available connector types with labels."""
-    return [
-        {"type": key, "label": val["label"]}
-        for key, val in CONNECTOR_PROFILES.items()
-    ]
+    return list(_CONNECTOR_LIST)
+
+
+def list_connectors_json() -> bytes:
+    """Pre-encoded JSON body {"connectors": [...]} for the connectors endpoint."""
+    return _CONNECTOR_LIST_JSON
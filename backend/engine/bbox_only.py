@@ -3,10 +3,39 @@ ShellForge - Generate enclosure from manual bounding box (no model file needed).
 Useful for quick testing and for users who just know their component sizes.
 """
 import cadquery as cq
+import functools
+import itertools
+import logging
 import math
 from pathlib import Path
 
-from .models import EnclosureConfig, Component, Vector3, LidStyle, PartConfig
+import numpy as np
+
+from .geometry import _combined_bbox
+from .models import EnclosureConfig, EnclosureResult, Component, Vector3, LidStyle
+
+logger = logging.getLogger(__name__)
+
+
+# Corners of a unit half-extent box: every (±1, ±1, ±1)
+_UNIT_CORNERS = np.array(list(itertools.product((-1.0, 1.0), repeat=3)))
+
+
+@functools.lru_cache(maxsize=4096)
+def _rot_matrix(rot_x, rot_y, rot_z):
+    """
+    Rotation matrix R = Rz * Ry * Rx (intrinsic XYZ = extrinsic ZYX), Three.js
+    convention, as a hashable 3x3 tuple. Cached: while a component is being
+    dragged the same (quantized) angles come back on every request.
+    """
+    cx, sx = math.cos(rot_x), math.sin(rot_x)
+    cy, sy = math.cos(rot_y), math.sin(rot_y)
+    cz, sz = math.cos(rot_z), math.sin(rot_z)
+    return (
+        (cz * cy, cz * sy * sx - sz * cx, cz * sy * cx + sz * sx),
+        (sz * cy, sz * sy * sx + cz * cx, sz * sy * cx - cz * sx),
+        (-sy, cy * sx, cy * cx),
+    )
 
 
 def _rotated_bbox(width, depth, height, rot_x=0, rot_y=0, rot_z=0):
@@ -19,69 +48,63 @@ def _rotated_bbox(width, depth, height, rot_x=0, rot_y=0, rot_z=0):
     if rot_x == 0 and rot_y == 0 and rot_z == 0:
         return width, depth, height
 
+    # ~0.006 deg resolution: keeps the matrix cache small and hits stable
+    rot_x, rot_y, rot_z = round(rot_x, 4), round(rot_y, 4), round(rot_z, 4)
     hw, hh, hd = width / 2, height / 2, depth / 2
 
-    # Build rotation matrices for XYZ Euler (Three.js convention)
-    cx, sx = math.cos(rot_x), math.sin(rot_x)
-    cy, sy = math.cos(rot_y), math.sin(rot_y)
-    cz, sz = math.cos(rot_z), math.sin(rot_z)
+    r = np.array(_rot_matrix(rot_x, rot_y, rot_z))
 
-    # Rotate 8 corners in Three.js local space: (±hw, ±hh, ±hd)
-    # Apply R = Rz * Ry * Rx (intrinsic XYZ = extrinsic ZYX)
-    corners = []
-    for sx_ in [-1, 1]:
-        for sy_ in [-1, 1]:
-            for sz_ in [-1, 1]:
-                x, y, z = sx_ * hw, sy_ * hh, sz_ * hd
-                # Apply rotX
-                x1 = x
-                y1 = y * cx - z * sx
-                z1 = y * sx + z * cx
-                # Apply rotY
-                x2 = x1 * cy + z1 * sy
-                y2 = y1
-                z2 = -x1 * sy + z1 * cy
-                # Apply rotZ
-                x3 = x2 * cz - y2 * sz
-                y3 = x2 * sz + y2 * cz
-                z3 = z2
-                corners.append((x3, y3, z3))
-
-    xs = [c[0] for c in corners]
-    ys = [c[1] for c in corners]
-    zs = [c[2] for c in corners]
+    # Rotate the 8 corners (±hw, ±hh, ±hd) in Three.js local space in one go
+    corners = _UNIT_CORNERS * (hw, hh, hd)
+    rotated = corners @ r.T
+    ext = rotated.max(axis=0) - rotated.min(axis=0)
 
     # Three.js: X=engX, Y=engZ(up), Z=engY(depth)
-    eff_width  = max(xs) - min(xs)   # engineering width (X)
-    eff_height = max(ys) - min(ys)   # engineering height (Z/up) from Three.js Y
-    eff_depth  = max(zs) - min(zs)   # engineering depth (Y) from Three.js Z
+    eff_width = float(ext[0])    # engineering width (X)
+    eff_height = float(ext[1])   # engineering height (Z/up) from Three.js Y
+    eff_depth = float(ext[2])    # engineering depth (Y) from Three.js Z
     return eff_width, eff_depth, eff_height
+
+
 from .generator import (
-    compute_combined_bbox,
-    _apply_connector_cutout,
-    _apply_custom_cutout,
+    _apply_cutouts,
     _apply_enclosure_style,
     _add_pcb_standoffs,
     _build_lid_screws,
-    _build_footprint,
-    _export_shape,
-    _apply_edges,
+    _add_screw_bosses,
+    _cylinder_compound,
+    _build_hollow_shell,
+    _submit_export,
+    _collect_exports,
+    _build_lid_plate,
+    _get_part,
+    _box,
+    _XY,
 )
 
 
-def _get_part(config: EnclosureConfig, part_name: str) -> PartConfig:
-    """Get part config, falling back to defaults if not present."""
-    parts = config.parts
-    if isinstance(parts, dict):
-        return parts.get(part_name, PartConfig())
-    return PartConfig()
+# Numeric fields of a manual component spec; (w, d, h) are the rotated extents
+_SPEC_DTYPE = np.dtype([
+    ("x", "f8"), ("y", "f8"), ("gz", "f8"),
+    ("w", "f8"), ("d", "f8"), ("h", "f8"),
+])
+
+
+def _spec_row(spec: dict) -> tuple:
+    """One _SPEC_DTYPE record for a component spec dict."""
+    eff_w, eff_d, eff_h = _rotated_bbox(
+        spec["width"], spec["depth"], spec["height"],
+        rot_x=spec.get("rot_x", 0), rot_y=spec.get("rot_y", 0), rot_z=spec.get("rot_z", 0),
+    )
+    gz = spec.get("ground_z", spec.get("z", 0))
+    return (spec.get("x", 0), spec.get("y", 0), gz, eff_w, eff_d, eff_h)
 
 
 def generate_from_manual_bbox(
     components_bbox: list,
     config: EnclosureConfig,
     output_dir: str = "./output"
-) -> dict:
+) -> EnclosureResult:
     """
     Generate enclosure from manually specified bounding boxes.
 
@@ -103,46 +126,39 @@ def generate_from_manual_bbox(
         },
         ...
     ]
+
+    Returns an EnclosureResult mapping part names to STL paths, with the
+    cavity dimensions (inner_w, inner_d, inner_h) in mm as .inner_bbox.
     """
-    # Convert dict specs to Component objects with pre-computed bboxes
+    if not components_bbox:
+        raise ValueError("No components provided")
+
+    # Parse the numeric spec fields once into a structured array, then derive
+    # every component bbox (and the combined one) in whole-array operations
+    specs = np.fromiter(
+        (_spec_row(spec) for spec in components_bbox),
+        dtype=_SPEC_DTYPE, count=len(components_bbox),
+    )
+    half_w = specs["w"] / 2
+    half_d = specs["d"] / 2
+    mins = np.stack([specs["x"] - half_w, specs["y"] - half_d, specs["gz"]], axis=1)
+    maxs = np.stack([specs["x"] + half_w, specs["y"] + half_d, specs["gz"] + specs["h"]], axis=1)
+
+    # Component objects are still needed by the standoff / cutout helpers
     components = []
-    for spec in components_bbox:
-        gz = spec.get("ground_z", spec.get("z", 0))
-        rx = spec.get("rot_x", 0)
-        ry = spec.get("rot_y", 0)
-        rz = spec.get("rot_z", 0)
-
-        # Compute effective (rotated) dimensions for AABB
-        eff_w, eff_d, eff_h = _rotated_bbox(
-            spec["width"], spec["depth"], spec["height"],
-            rot_x=rx, rot_y=ry, rot_z=rz,
-        )
-
+    for spec, row, lo, hi in zip(components_bbox, specs, mins.tolist(), maxs.tolist()):
+        gz = float(row["gz"])
         comp = Component(
             name=spec["name"],
             file_path="",  # no file for manual bbox
-            position=Vector3(
-                spec.get("x", 0),
-                spec.get("y", 0),
-                gz,
-            ),
+            position=Vector3(float(row["x"]), float(row["y"]), gz),
             is_pcb=spec.get("is_pcb", False),
             pcb_screw_diameter=spec.get("pcb_screw_diameter", 3.0),
             ground_z=gz,
             standoff_positions=spec.get("standoff_positions", []),
         )
-        hw = eff_w / 2
-        hd = eff_d / 2
-        comp.bbox_min = Vector3(
-            comp.position.x - hw,
-            comp.position.y - hd,
-            gz,
-        )
-        comp.bbox_max = Vector3(
-            comp.position.x + hw,
-            comp.position.y + hd,
-            gz + eff_h,
-        )
+        comp.bbox_min = Vector3(*lo)
+        comp.bbox_max = Vector3(*hi)
         components.append(comp)
 
     config.components = components
@@ -167,7 +183,7 @@ def generate_from_manual_bbox(
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
 
-    bbox_min, bbox_max = compute_combined_bbox(components)
+    bbox_min, bbox_max = _combined_bbox(mins, maxs)
 
     cavity_center_x = (bbox_min.x + bbox_max.x) / 2
     cavity_center_y = (bbox_min.y + bbox_max.y) / 2
@@ -191,51 +207,36 @@ def generate_from_manual_bbox(
     boss_h = max(config.screw_length - lid_t, 3.0)
 
     # --- Build base shell using footprint ---
-    footprint = _build_footprint(outer_w, outer_d, config.footprint)
-    base = footprint.extrude(outer_h)
-
-    cavity_fp = _build_footprint(inner_w, inner_d, config.footprint)
-    cavity = cavity_fp.extrude(inner_h).translate((0, 0, floor))
-    base = base.cut(cavity)
-
-    base = _apply_edges(base, base_part, eff_fillet)
+    base = _build_hollow_shell(
+        outer_w, outer_d, outer_h, inner_w, inner_d, inner_h, floor,
+        config.footprint, base_part.edge_style, base_part.chamfer_size, eff_fillet,
+    )
 
     # --- Screw bosses ---
     if config.lid_style == LidStyle.SCREWS and style != "minimal":
-        boss_r = config.boss_diameter / 2
-        screw_r = config.screw_diameter / 2
-        inset = boss_r + wall
-        for sx, sy in [(1, 1), (1, -1), (-1, 1), (-1, -1)]:
-            bx = sx * (inner_w / 2 - inset)
-            by = sy * (inner_d / 2 - inset)
-            boss = cq.Workplane("XY").cylinder(boss_h, boss_r).translate((bx, by, floor + boss_h / 2))
-            hole = cq.Workplane("XY").cylinder(boss_h + 1, screw_r).translate((bx, by, floor + boss_h / 2))
-            base = base.union(boss).cut(hole)
+        base = _add_screw_bosses(
+            base, inner_w, inner_d, wall, floor, boss_h,
+            boss_r=config.boss_diameter / 2,
+            screw_r=config.screw_diameter / 2,
+        )
 
     # --- PCB standoffs ---
     if config.pcb_standoffs_enabled:
         base = _add_pcb_standoffs(base, components, cavity_center_x, cavity_center_y, floor)
 
-    # --- Connector cutouts ---
-    for cutout in config.cutouts:
-        try:
-            base = _apply_connector_cutout(base, cutout, inner_size, wall, inner_center, outer_h)
-        except Exception as e:
-            print(f"Warning: cutout skipped: {e}")
-
-    # --- Custom cutouts ---
-    for cutout in config.custom_cutouts:
-        base = _apply_custom_cutout(base, cutout, inner_size, wall, inner_center, outer_h)
+    # --- Connector + custom cutouts ---
+    base = _apply_cutouts(
+        base, config.cutouts, config.custom_cutouts,
+        inner_size, wall, inner_center, outer_h,
+    )
 
     # --- Enclosure style (vented/ribbed) ---
     base = _apply_enclosure_style(base, style, outer_w, outer_d, outer_h, wall, floor)
 
-    # --- Export base ---
-    base_path = output_path / "enclosure_base.stl"
-    _export_shape(base, base_path)
-    result = {"base": str(base_path)}
-    if (output_path / "enclosure_base.3mf").exists():
-        result["base_3mf"] = str(output_path / "enclosure_base.3mf")
+    # Export finished parts in the background while the rest are built
+    tolerances = (config.export_tolerance, config.export_angular_tolerance)
+    exports = {}
+    _submit_export(exports, "base", base, output_path, tolerances=tolerances)
 
     # --- Generate lid ---
     if config.lid_style != LidStyle.NONE:
@@ -247,9 +248,10 @@ def generate_from_manual_bbox(
             lid_fillet = 0.0
         lid_hole_style = lid_part.lid_hole_style if lid_part.lid_hole_style else config.lid_hole_style
 
-        lid_fp = _build_footprint(outer_w, outer_d, config.footprint)
-        lid = lid_fp.extrude(lid_t)
-        lid = _apply_edges(lid, lid_part, lid_fillet)
+        lid = _build_lid_plate(
+            outer_w, outer_d, lid_t, config.footprint,
+            lid_part.edge_style, lid_part.chamfer_size, lid_fillet,
+        )
 
         if config.lid_style == LidStyle.SCREWS:
             lid = _build_lid_screws(
@@ -265,23 +267,11 @@ def generate_from_manual_bbox(
             )
         elif config.lid_style == LidStyle.SNAP:
             rim_h = config.snap_depth * 2
-            rim = (
-                cq.Workplane("XY")
-                .box(inner_w, inner_d, rim_h)
-                .translate((0, 0, lid_t + rim_h / 2))
-            )
-            rim_inner = (
-                cq.Workplane("XY")
-                .box(inner_w - wall * 2, inner_d - wall * 2, rim_h + 1)
-                .translate((0, 0, lid_t + rim_h / 2))
-            )
-            lid = lid.union(rim).cut(rim_inner)
+            rim = _box(inner_w, inner_d, rim_h, (0, 0, lid_t + rim_h / 2))
+            rim_inner = _box(inner_w - wall * 2, inner_d - wall * 2, rim_h + 1, (0, 0, lid_t + rim_h / 2))
+            lid = lid.union(rim, glue=True).cut(rim_inner)  # rim sits on the lid face
 
-        lid_path = output_path / "enclosure_lid.stl"
-        _export_shape(lid, lid_path)
-        result["lid"] = str(lid_path)
-        if (output_path / "enclosure_lid.3mf").exists():
-            result["lid_3mf"] = str(output_path / "enclosure_lid.3mf")
+        _submit_export(exports, "lid", lid, output_path, tolerances=tolerances)
 
     # --- Generate tray (optional) ---
     if tray_part.enabled:
@@ -292,15 +282,11 @@ def generate_from_manual_bbox(
         tray_w = inner_w - clearance * 2
         tray_d = inner_d - clearance * 2
 
-        tray = (
-            cq.Workplane("XY")
-            .box(tray_w, tray_d, tray_thickness)
-            .translate((0, 0, floor + tray_z + tray_thickness / 2))
+        tray = cq.Workplane(_XY).add(
+            _box(tray_w, tray_d, tray_thickness, (0, 0, floor + tray_z + tray_thickness / 2))
         )
 
-        tray_path = output_path / "enclosure_tray.stl"
-        _export_shape(tray, tray_path)
-        result["tray"] = str(tray_path)
+        _submit_export(exports, "tray", tray, output_path, tolerances=tolerances)
 
     # --- Generate bracket (optional) ---
     if bracket_part.enabled:
@@ -311,39 +297,32 @@ def generate_from_manual_bbox(
         bracket_t = bracket_wall
 
         # Flat back plate
-        back_plate = (
-            cq.Workplane("XY")
-            .box(bracket_w, bracket_t, bracket_h)
-            .translate((0, 0, bracket_h / 2))
-        )
+        back_plate = _box(bracket_w, bracket_t, bracket_h, (0, 0, bracket_h / 2))
 
         # L-flange (mounts to enclosure side)
         flange_d = 12.0
-        flange = (
-            cq.Workplane("XY")
-            .box(bracket_w, flange_d, bracket_t)
-            .translate((0, flange_d / 2, bracket_h))
-        )
-        bracket = back_plate.union(flange)
+        flange = _box(bracket_w, flange_d, bracket_t, (0, flange_d / 2, bracket_h))
+        bracket = cq.Workplane(_XY).add(back_plate).union(flange)
 
         # Drill 2 mounting holes in the back plate
         hole_r = hole_d / 2
-        for hz in [bracket_h * 0.25, bracket_h * 0.75]:
-            hole = (
-                cq.Workplane("YZ")
-                .cylinder(bracket_t + 2, hole_r)
-                .translate((0, 0, hz))
+        # A zero diameter means no holes; a zero-radius cylinder would only raise
+        if hole_r > 0:
+            holes = _cylinder_compound(
+                [(0, 0, bracket_h * 0.25), (0, 0, bracket_h * 0.75)],
+                bracket_t + 2, hole_r, direction=(1, 0, 0),
             )
             try:
-                bracket = bracket.cut(hole)
-            except Exception:
-                pass
+                bracket = bracket.cut(holes)
+            except Exception as e:
+                logger.warning("Could not cut bracket mounting holes: %s", e)
+
+        _submit_export(exports, "bracket", bracket, output_path, tolerances=tolerances)
 
-        bracket_path = output_path / "enclosure_bracket.stl"
-        _export_shape(bracket, bracket_path)
-        result["bracket"] = str(bracket_path)
+    # --- Wait for the exports ---
+    result = EnclosureResult(_collect_exports(exports), (inner_w, inner_d, inner_h))
 
-    print(f"[OK] Enclosure generated from manual bbox: {result}")
-    print(f"   Inner: {inner_w:.1f} x {inner_d:.1f} x {inner_h:.1f} mm")
-    print(f"   Outer: {outer_w:.1f} x {outer_d:.1f} x {outer_h:.1f} mm")
+    logger.info("Enclosure generated from manual bbox: %s", result)
+    logger.info("   Inner: %.1f x %.1f x %.1f mm", inner_w, inner_d, inner_h)
+    logger.info("   Outer: %.1f x %.1f x %.1f mm", outer_w, outer_d, outer_h)
     return result
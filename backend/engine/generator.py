@@ -3,333 +3,780 @@ ShellForge - Core enclosure generator engine.
 Uses CadQuery to generate 3D printable enclosures from component bounding boxes.
 """
 import cadquery as cq
+import contextlib
+import functools
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import struct
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict
 from pathlib import Path
-from typing import Optional
-import math
+from xml.sax.saxutils import quoteattr
+
+import numpy as np
+
+try:
+    import trimesh
+except ImportError:  # ASCII STL models are unavailable without trimesh
+    trimesh = None
 
 from .models import (
     EnclosureConfig, Component, ConnectorCutout, CustomCutout,
     LidStyle, WallFace, ConnectorType, CustomCutoutShape, Vector3, PartConfig,
-    FootprintConfig
+    FootprintConfig, EnclosureResult
+)
+from .geometry import (  # re-exported; pure-Python, no CadQuery
+    compute_combined_bbox, _CORNERS, _CORNER_SIGNS, _footprint_points, _footprint_key,
 )
 from ..connectors.profiles import get_profile
 
+logger = logging.getLogger(__name__)
+
+# Sketch planes built once: cq.Plane.named() constructs every named plane on
+# each call, and a Workplane never modifies the plane it is created on
+_PLANES = {name: cq.Plane.named(name) for name in ("XY", "XZ", "YZ")}
+_XY = _PLANES["XY"]
+
+
+# On-disk bbox cache shared across processes, keyed by model content. Set
+# SHELLFORGE_BBOX_CACHE to another path, or to an empty string to disable it.
+BBOX_CACHE_PATH = os.environ.get(
+    "SHELLFORGE_BBOX_CACHE",
+    str(Path.home() / ".cache" / "shellforge" / "bboxes.sqlite"),
+)
+_BBOX_FORMAT = struct.Struct("<6d")
+
+
+def _bbox_db():
+    """Open the bbox cache database (one short-lived connection per call, so threads never share one)."""
+    Path(BBOX_CACHE_PATH).parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(BBOX_CACHE_PATH, timeout=5)
+    db.execute("CREATE TABLE IF NOT EXISTS bbox (hash BLOB PRIMARY KEY, bbox BLOB NOT NULL)")
+    return db
+
+
+def _cached_bbox(digest: bytes):
+    """Bbox stored for this content hash, or None (also if the cache is unusable)."""
+    if not BBOX_CACHE_PATH:
+        return None
+    try:
+        with contextlib.closing(_bbox_db()) as db:
+            row = db.execute("SELECT bbox FROM bbox WHERE hash = ?", (digest,)).fetchone()
+    except (sqlite3.Error, OSError) as e:
+        logger.warning("Bbox cache unavailable: %s", e)
+        return None
+    return _BBOX_FORMAT.unpack(row[0]) if row else None
+
+
+def _store_bbox(digest: bytes, bbox: tuple) -> None:
+    """Remember a computed bbox; the cache is best-effort, so failures are only logged."""
+    if not BBOX_CACHE_PATH:
+        return
+    try:
+        with contextlib.closing(_bbox_db()) as db, db:
+            db.execute(
+                "INSERT OR REPLACE INTO bbox (hash, bbox) VALUES (?, ?)",
+                (digest, _BBOX_FORMAT.pack(*bbox)),
+            )
+    except (sqlite3.Error, OSError) as e:
+        logger.warning("Could not write bbox cache: %s", e)
+
+
+@functools.lru_cache(maxsize=256)
+def _file_digest(path_str: str, mtime_ns: int, size: int) -> bytes:
+    """Content hash of a model file; mtime_ns and size are only part of the cache key."""
+    return hashlib.blake2b(Path(path_str).read_bytes(), digest_size=16).digest()
+
+
+# Binary STL record: normal, three vertices, attribute byte count
+_STL_TRIANGLE = np.dtype([("normal", "<f4", 3), ("vertices", "<f4", (3, 3)), ("attr", "<u2")])
+
+
+def _stl_bbox(path_str: str) -> tuple:
+    """
+    Raw bbox of an STL model, read straight from its triangles (no OCCT
+    import, which CadQuery doesn't offer for STL anyway). Binary files are
+    reduced with numpy; ASCII ones go through trimesh.
+    """
+    data = Path(path_str).read_bytes()
+    count = struct.unpack_from("<I", data, 80)[0] if len(data) >= 84 else -1
+    if count > 0 and len(data) == 84 + _STL_TRIANGLE.itemsize * count:
+        vertices = np.frombuffer(data, _STL_TRIANGLE, count, 84)["vertices"].reshape(-1, 3)
+        lo, hi = vertices.min(axis=0), vertices.max(axis=0)
+    else:
+        if trimesh is None:
+            raise RuntimeError("trimesh is required to load ASCII STL models")
+        lo, hi = trimesh.load(path_str, file_type="stl", force="mesh", process=False).bounds
+    return tuple(float(v) for v in (*lo, *hi))
+
+
+@functools.lru_cache(maxsize=256)
+def _load_raw_bbox(path_str: str, mtime_ns: int, size: int) -> tuple:
+    """
+    Import a STEP/STL file and return its raw (xmin, ymin, zmin, xmax, ymax, zmax).
+    mtime_ns and size are only part of the cache key, so an edited file is reloaded.
+    Behind this in-process cache sits the on-disk one, keyed by the file's
+    content hash, so a fresh process skips the import for models it has seen.
+    """
+    ext = Path(path_str).suffix.lower()
+    if ext not in (".step", ".stp", ".stl"):
+        raise ValueError(f"Unsupported file format: {ext}. Use STEP (.step/.stp) or STL (.stl)")
+
+    digest = _file_digest(path_str, mtime_ns, size)
+    cached = _cached_bbox(digest)
+    if cached is not None:
+        return cached
+
+    if ext == ".stl":
+        bbox = _stl_bbox(path_str)
+    else:
+        # BoundingBox() bounds the exact geometry (BRepBndLib::AddOptimal),
+        # without meshing; it costs well under 1% of the STEP import
+        bb = cq.importers.importStep(path_str).val().BoundingBox()
+        bbox = (bb.xmin, bb.ymin, bb.zmin, bb.xmax, bb.ymax, bb.zmax)
+    _store_bbox(digest, bbox)
+    return bbox
+
+
+# One lock per model path, so components sharing a file (loaded concurrently
+# by generate_enclosure) import it once instead of all missing the cache together
+_BBOX_LOCKS = {}
+_BBOX_LOCKS_GUARD = threading.Lock()
+
+
+def _bbox_lock(path_str: str) -> threading.Lock:
+    with _BBOX_LOCKS_GUARD:
+        return _BBOX_LOCKS.setdefault(path_str, threading.Lock())
+
 
 def load_component_bbox(component: Component) -> Component:
     """
     Load a 3D model (STEP or STL) and compute its bounding box.
     Returns the component with bbox_min and bbox_max filled in.
+    The model's own bbox is cached per file, so regenerating with the same
+    models only pays for the position offset.
     """
     path = Path(component.file_path)
-    if not path.exists():
-        raise FileNotFoundError(f"Component file not found: {component.file_path}")
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Component file not found: {component.file_path}") from None
 
-    ext = path.suffix.lower()
+    path_str = str(path.resolve())
+    with _bbox_lock(path_str):
+        xmin, ymin, zmin, xmax, ymax, zmax = _load_raw_bbox(path_str, st.st_mtime_ns, st.st_size)
 
-    if ext in (".step", ".stp"):
-        shape = cq.importers.importStep(str(path))
-    elif ext == ".stl":
-        shape = cq.importers.importShape("STL", str(path))
-    else:
-        raise ValueError(f"Unsupported file format: {ext}. Use STEP (.step/.stp) or STL (.stl)")
+    # Apply component position offset
+    pos = component.position
+    component.bbox_min = Vector3(xmin + pos.x, ymin + pos.y, zmin + pos.z)
+    component.bbox_max = Vector3(xmax + pos.x, ymax + pos.y, zmax + pos.z)
+
+    return component
 
-    bb = shape.val().BoundingBox()
 
-    # Apply component position offset
-    component.bbox_min = Vector3(
-        bb.xmin + component.position.x,
-        bb.ymin + component.position.y,
-        bb.zmin + component.position.z,
+@functools.lru_cache(maxsize=64)
+def _footprint_wire(outer_w: float, outer_d: float, footprint_key: tuple) -> cq.Wire:
+    """
+    Cached, closed outline wire of the footprint, made straight from its
+    points (no Workplane sketch); callers must not modify it.
+    """
+    pts = _footprint_points(outer_w, outer_d, FootprintConfig(*footprint_key))
+    return cq.Wire.makePolygon([(x, y, 0) for x, y in pts], close=True)
+
+
+def _cylinder_compound(centers, height: float, radius: float, direction=(0, 0, 1)) -> cq.Compound:
+    """
+    Equal cylinders centred on each (x, y, z) point, gathered in one compound
+    so that adding or removing all of them costs a single boolean. The solid
+    is built once and placed by location, so every copy shares its geometry.
+    """
+    d = cq.Vector(*direction)
+    proto = cq.Solid.makeCylinder(radius, height, d * (-height / 2), d)
+    return cq.Compound.makeCompound([
+        proto.moved(cq.Location(cq.Vector(*c))) for c in centers
+    ])
+
+
+def _box(w: float, d: float, h: float, center=(0, 0, 0)) -> cq.Solid:
+    """Axis-aligned box centred on center, made directly as a Solid (no Workplane stack)."""
+    cx, cy, cz = center
+    return cq.Solid.makeBox(w, d, h, cq.Vector(cx - w / 2, cy - d / 2, cz - h / 2))
+
+
+@functools.lru_cache(maxsize=64)
+def _corner_cylinders(x: float, y: float, z: float, height: float, radius: float) -> cq.Compound:
+    """
+    Four equal cylinders at (+-x, +-y, z). Every enclosure with the same
+    corner layout reuses the same compound; callers only feed it to booleans.
+    """
+    return _cylinder_compound(
+        [(sx * x, sy * y, z) for sx, sy in _CORNERS], height, radius,
     )
-    component.bbox_max = Vector3(
-        bb.xmax + component.position.x,
-        bb.ymax + component.position.y,
-        bb.zmax + component.position.z,
+
+
+def _add_screw_bosses(
+    base: cq.Workplane,
+    inner_w: float,
+    inner_d: float,
+    wall: float,
+    floor: float,
+    boss_h: float,
+    boss_r: float,
+    screw_r: float,
+) -> cq.Workplane:
+    """Add the four corner screw bosses: one union for the bosses, one cut for the holes."""
+    inset = boss_r + wall
+    x, y, z = inner_w / 2 - inset, inner_d / 2 - inset, floor + boss_h / 2
+    bosses = _corner_cylinders(x, y, z, boss_h, boss_r)
+    holes = _corner_cylinders(x, y, z, boss_h + 1, screw_r)
+    # Bosses only touch the floor face, so the fuse can skip intersection tests
+    return base.union(bosses, glue=True).cut(holes)
+
+
+# Default mesh deflection for exported parts; see EnclosureConfig.export_tolerance
+EXPORT_TOLERANCE = EnclosureConfig.export_tolerance
+EXPORT_ANGULAR_TOLERANCE = EnclosureConfig.export_angular_tolerance
+_DEFAULT_TOLERANCES = (EXPORT_TOLERANCE, EXPORT_ANGULAR_TOLERANCE)
+
+
+_3MF_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="utf-8"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Override PartName="/3D/3dmodel.model" '
+    'ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml" />'
+    '<Override PartName="/_rels/.rels" '
+    'ContentType="application/vnd.openxmlformats-package.relationships+xml" />'
+    '</Types>'
+)
+_3MF_RELS = (
+    '<?xml version="1.0" encoding="utf-8"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Target="/3D/3dmodel.model" Id="rel-1" '
+    'Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel" TargetMode="Internal" />'
+    '</Relationships>'
+)
+
+
+def _stl_mesh(stl_path: Path) -> tuple:
+    """Welded (vertices (N, 3), triangles (M, 3)) of a binary STL, via numpy."""
+    st = stl_path.stat()
+    return _welded_stl(str(stl_path), st.st_mtime_ns, st.st_size)
+
+
+@functools.lru_cache(maxsize=8)
+def _welded_stl(path_str: str, mtime_ns: int, size: int) -> tuple:
+    """
+    Cached body of _stl_mesh; mtime_ns and size are only part of the key.
+    The assembly 3MF reuses the meshes just welded for each part's own 3MF,
+    so callers must not modify the arrays.
+    """
+    data = Path(path_str).read_bytes()
+    count = struct.unpack_from("<I", data, 80)[0]
+    corners = np.frombuffer(data, _STL_TRIANGLE, count, 84)["vertices"].reshape(-1, 3)
+    vertices, triangles = np.unique(corners, axis=0, return_inverse=True)
+    return vertices, triangles.reshape(-1, 3)
+
+
+def _write_3mf(threemf_path: Path, objects: list):
+    """
+    Write a 3MF of mesh objects [(name, vertices, triangles, transform)], one
+    build item each. transform is a 3MF "m00 m01 ... m32" string, or None.
+    The XML is formatted in bulk rather than built element by element.
+    """
+    resources, items = [], []
+    for object_id, (name, vertices, triangles, transform) in enumerate(objects, start=1):
+        vertex_xml = "".join(
+            f'<vertex x="{x!r}" y="{y!r}" z="{z!r}" />' for x, y, z in vertices.astype(float).tolist()
+        )
+        triangle_xml = "".join(
+            f'<triangle v1="{a}" v2="{b}" v3="{c}" />' for a, b, c in triangles.tolist()
+        )
+        resources.append(
+            f'<object id="{object_id}" name={quoteattr(name)} type="model"><mesh>'
+            f'<vertices>{vertex_xml}</vertices><triangles>{triangle_xml}</triangles>'
+            '</mesh></object>'
+        )
+        placed = f' transform="{transform}"' if transform else ""
+        items.append(f'<item objectid="{object_id}"{placed} />')
+
+    model = (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<model xml:lang="en-US" xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02" '
+        'unit="millimeter"><metadata name="Application">ShellForge</metadata>'
+        f'<resources>{"".join(resources)}</resources><build>{"".join(items)}</build></model>'
     )
+    with zipfile.ZipFile(threemf_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("_rels/.rels", _3MF_RELS)
+        zf.writestr("[Content_Types].xml", _3MF_CONTENT_TYPES)
+        zf.writestr("3D/3dmodel.model", model)
 
-    return component
 
+def _stl_to_3mf(stl_path: Path, threemf_path: Path):
+    """
+    Write a 3MF next to a binary STL from the STL's own triangles, instead of
+    re-tessellating the shape through cq.exporters' per-vertex Python path.
+    """
+    vertices, triangles = _stl_mesh(stl_path)
+    _write_3mf(threemf_path, [(stl_path.stem, vertices, triangles, None)])
 
-def compute_combined_bbox(components: list) -> tuple:
-    """
-    Compute the combined bounding box of all components.
-    Returns (bbox_min, bbox_max).
-    """
-    if not components:
-        raise ValueError("No components provided")
-
-    min_x = min(c.bbox_min.x for c in components)
-    min_y = min(c.bbox_min.y for c in components)
-    min_z = min(c.bbox_min.z for c in components)
-    max_x = max(c.bbox_max.x for c in components)
-    max_y = max(c.bbox_max.y for c in components)
-    max_z = max(c.bbox_max.z for c in components)
-
-    return Vector3(min_x, min_y, min_z), Vector3(max_x, max_y, max_z)
-
-
-def _build_footprint(outer_w: float, outer_d: float, fp: FootprintConfig) -> cq.Workplane:
-    """Build a 2D footprint workplane for the enclosure base/lid."""
-    shape = fp.shape
-
-    if shape == "rectangle":
-        return cq.Workplane("XY").rect(outer_w, outer_d)
-
-    elif shape == "l_shape":
-        nw = fp.notch_w or outer_w * 0.4
-        nd = fp.notch_d or outer_d * 0.4
-        corner = fp.notch_corner
-        hw, hd = outer_w / 2, outer_d / 2
-        if corner == "top_right":
-            pts = [(-hw, -hd), (hw, -hd), (hw, hd - nd), (hw - nw, hd - nd), (hw - nw, hd), (-hw, hd)]
-        elif corner == "top_left":
-            pts = [(-hw, -hd), (hw, -hd), (hw, hd), (-hw + nw, hd), (-hw + nw, hd - nd), (-hw, hd - nd)]
-        elif corner == "bottom_right":
-            pts = [(-hw, -hd), (hw - nw, -hd), (hw - nw, -hd + nd), (hw, -hd + nd), (hw, hd), (-hw, hd)]
-        else:  # bottom_left
-            pts = [(-hw + nw, -hd), (-hw + nw, -hd + nd), (-hw, -hd + nd), (-hw, hd), (hw, hd), (hw, -hd)]
-        return cq.Workplane("XY").polyline(pts).close()
-
-    elif shape == "t_shape":
-        tw = fp.tab_w or outer_w * 0.4
-        td = fp.tab_d or outer_d * 0.3
-        side = fp.tab_side
-        hw, hd = outer_w / 2, outer_d / 2
-        if side == "top":
-            pts = [(-hw, -hd), (hw, -hd), (hw, hd - td), (tw / 2, hd - td), (tw / 2, hd),
-                   (-tw / 2, hd), (-tw / 2, hd - td), (-hw, hd - td)]
-        elif side == "bottom":
-            pts = [(-tw / 2, -hd), (tw / 2, -hd), (tw / 2, -hd + td), (hw, -hd + td),
-                   (hw, hd), (-hw, hd), (-hw, -hd + td), (-tw / 2, -hd + td)]
-        elif side == "right":
-            pts = [(-hw, -hd), (hw - td, -hd), (hw - td, -tw / 2), (hw, -tw / 2),
-                   (hw, tw / 2), (hw - td, tw / 2), (hw - td, hd), (-hw, hd)]
-        else:  # left
-            pts = [(-hw + td, -hd), (hw, -hd), (hw, hd), (-hw + td, hd),
-                   (-hw + td, tw / 2), (-hw, tw / 2), (-hw, -tw / 2), (-hw + td, -tw / 2)]
-        return cq.Workplane("XY").polyline(pts).close()
-
-    elif shape == "u_shape":
-        nw = fp.u_notch_w or outer_w * 0.5
-        nd = fp.u_notch_d or outer_d * 0.5
-        side = fp.u_open_side
-        hw, hd = outer_w / 2, outer_d / 2
-        if side == "top":
-            pts = [(-hw, -hd), (hw, -hd), (hw, hd), (nw / 2, hd), (nw / 2, hd - nd),
-                   (-nw / 2, hd - nd), (-nw / 2, hd), (-hw, hd)]
-        elif side == "bottom":
-            pts = [(-hw, -hd), (-nw / 2, -hd), (-nw / 2, -hd + nd), (nw / 2, -hd + nd),
-                   (nw / 2, -hd), (hw, -hd), (hw, hd), (-hw, hd)]
-        elif side == "right":
-            pts = [(-hw, -hd), (hw, -hd), (hw, -nw / 2), (hw - nd, -nw / 2),
-                   (hw - nd, nw / 2), (hw, nw / 2), (hw, hd), (-hw, hd)]
-        else:  # left
-            pts = [(-hw, -hd), (hw, -hd), (hw, hd), (-hw, hd), (-hw, nw / 2),
-                   (-hw + nd, nw / 2), (-hw + nd, -nw / 2), (-hw, -nw / 2)]
-        return cq.Workplane("XY").polyline(pts).close()
-
-    elif shape == "plus":
-        af = fp.arm_fraction
-        hw, hd = outer_w / 2, outer_d / 2
-        aw = outer_w * af / 2  # arm half-width
-        ad = outer_d * af / 2
-        pts = [
-            (-aw, -hd), (aw, -hd), (aw, -ad), (hw, -ad), (hw, ad),
-            (aw, ad), (aw, hd), (-aw, hd), (-aw, ad), (-hw, ad),
-            (-hw, -ad), (-aw, -ad)
-        ]
-        return cq.Workplane("XY").polyline(pts).close()
 
-    elif shape in ("hexagon", "octagon"):
-        sides = 6 if shape == "hexagon" else 8
-        r = min(outer_w, outer_d) / 2
-        return cq.Workplane("XY").polygon(sides, r)
+def _write_assembly_3mf(result: dict, output_path: Path, outer_h: float, lid_t: float, snap_lid: bool):
+    """
+    Write enclosure.3mf: every exported part in one file, assembled. The meshes
+    come from the parts' STLs, so nothing is tessellated again. The lid sits on
+    the base (a snap lid flipped so its rim drops into the cavity), the tray is
+    already in place and the bracket stands 10mm beside the base.
+    Returns the path, or None if it couldn't be written.
+    """
+    try:
+        meshes = {
+            name: _stl_mesh(Path(result[name]))
+            for name in ("base", "lid", "tray", "bracket") if name in result
+        }
+        placements = {}
+        if "lid" in meshes:
+            placements["lid"] = (
+                f"1 0 0 0 -1 0 0 0 -1 0 0 {outer_h + lid_t!r}" if snap_lid
+                else f"1 0 0 0 1 0 0 0 1 0 0 {outer_h!r}"
+            )
+        if "bracket" in meshes:
+            shift = float(meshes["base"][0][:, 0].max() + 10.0 - meshes["bracket"][0][:, 0].min())
+            placements["bracket"] = f"1 0 0 0 1 0 0 0 1 {shift!r} 0 0"
+
+        assembly_path = output_path / "enclosure.3mf"
+        _write_3mf(assembly_path, [
+            (f"ShellForge {name}", vertices, triangles, placements.get(name))
+            for name, (vertices, triangles) in meshes.items()
+        ])
+    except Exception as e:
+        logger.warning("Assembly 3MF export failed: %s", e)
+        return None
+    return assembly_path
+
+
+def _export_shape(shape, stl_path: Path, tolerances: tuple = _DEFAULT_TOLERANCES):
+    """
+    Export shape to (binary) STL, then convert that mesh to 3MF in memory.
+    tolerances is the (linear mm, angular rad) mesh deflection.
+    """
+    # Mesh and write directly (BRepMesh + StlAPI_Writer) so the deflection is
+    # absolute: cq.exporters scales it by each edge's length
+    solid = cq.Compound.makeCompound(shape.vals()) if isinstance(shape, cq.Workplane) else shape
+    solid.exportStl(str(stl_path), *tolerances, ascii=False, relative=False, parallel=True)
+    try:
+        _stl_to_3mf(stl_path, stl_path.with_suffix(".3mf"))
+    except Exception as e:
+        logger.warning("3MF export failed for %s: %s", stl_path.name, e)
+
+
+# Shared by every generation: parts are submitted as soon as they are finished,
+# so meshing and writing one part overlaps with building the next
+_EXPORT_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="shellforge-export")
+
+
+def _export_part(shape, stl_path: Path, key: str = None, tolerances: tuple = _DEFAULT_TOLERANCES):
+    """
+    Export one part and record the key of its inputs in an enclosure_<name>.meta.json
+    sidecar. The old sidecar goes first, so interrupted exports are never reused.
+    """
+    meta_path = stl_path.with_suffix(".meta.json")
+    meta_path.unlink(missing_ok=True)
+    _export_shape(shape, stl_path, tolerances)
+    if key:
+        meta_path.write_text(json.dumps({"key": key}))
+
+
+def _submit_export(
+    exports: dict, name: str, shape, output_path: Path,
+    key: str = None, tolerances: tuple = _DEFAULT_TOLERANCES,
+):
+    """Start exporting a finished part to enclosure_<name>.stl (+ .3mf) in the background."""
+    stl_path = output_path / f"enclosure_{name}.stl"
+    exports[name] = (stl_path, _EXPORT_POOL.submit(_export_part, shape, stl_path, key, tolerances))
+
 
-    # Fallback
-    return cq.Workplane("XY").rect(outer_w, outer_d)
+def _part_key(*inputs) -> str:
+    """Key of everything a part is built from (and of the engine code that builds it)."""
+    return hashlib.blake2b(_engine_digest() + repr(inputs).encode(), digest_size=16).hexdigest()
 
 
-def _export_shape(shape, stl_path: Path):
-    """Export shape to STL and attempt 3MF."""
-    cq.exporters.export(shape, str(stl_path))
-    threemf_path = stl_path.with_suffix(".3mf")
+def _reuse_part(exports: dict, name: str, key: str, output_path: Path) -> bool:
+    """
+    If output_path still holds enclosure_<name>.stl built from the same inputs
+    (per its sidecar), record it in exports as already exported and return True.
+    """
+    stl_path = output_path / f"enclosure_{name}.stl"
     try:
-        cq.exporters.export(shape, str(threemf_path))
-    except Exception:
-        pass  # 3MF may not be supported in all CadQuery builds
+        meta = json.loads(stl_path.with_suffix(".meta.json").read_text())
+    except (OSError, ValueError):
+        return False
+    if not isinstance(meta, dict) or meta.get("key") != key or not stl_path.exists():
+        return False
+    done = Future()
+    done.set_result(None)
+    exports[name] = (stl_path, done)
+    return True
+
+
+def _collect_exports(exports: dict) -> dict:
+    """
+    Wait for the exports started by _submit_export.
+    Returns {name: stl_path}, plus base_3mf / lid_3mf when those were written.
+    """
+    result = {}
+    for name, (path, future) in exports.items():
+        future.result()
+        result[name] = str(path)
+        threemf_path = path.with_suffix(".3mf")
+        if name in ("base", "lid") and threemf_path.exists():
+            result[f"{name}_3mf"] = str(threemf_path)
+    return result
 
 
-def _apply_connector_cutout(
-    shell: cq.Workplane,
-    cutout: ConnectorCutout,
+# Whole-enclosure cache: the exported files of each generated design, keyed by
+# its settings and model contents, so regenerating an unchanged design only
+# copies files. Set SHELLFORGE_RESULT_CACHE to another directory, or to an
+# empty string to disable it. Only the most recently used entries are kept.
+RESULT_CACHE_DIR = os.environ.get(
+    "SHELLFORGE_RESULT_CACHE",
+    str(Path.home() / ".cache" / "shellforge" / "results"),
+)
+RESULT_CACHE_ENTRIES = 64
+
+
+@functools.lru_cache(maxsize=1)
+def _engine_digest() -> bytes:
+    """Hash of the backend sources, so cached results never outlive the code that made them."""
+    digest = hashlib.blake2b(digest_size=16)
+    for source in sorted(Path(__file__).resolve().parents[1].rglob("*.py")):
+        digest.update(source.read_bytes())
+    return digest.digest()
+
+
+def _result_key(config: EnclosureConfig):
+    """
+    Result cache key for a config: its settings, with each component's model
+    path replaced by the model's content hash. None if a model can't be read
+    (generation then reports the error as usual).
+    """
+    settings = asdict(config)
+    try:
+        for component, raw in zip(config.components, settings["components"]):
+            path = Path(component.file_path).resolve()
+            st = path.stat()
+            raw["file_path"] = _file_digest(str(path), st.st_mtime_ns, st.st_size).hex()
+            # Filled in by load_component_bbox, so not part of the design
+            del raw["bbox_min"], raw["bbox_max"]
+    except OSError:
+        return None
+    blob = json.dumps(settings, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(_engine_digest() + blob, digest_size=16).hexdigest()
+
+
+def _restore_result(key: str, output_path: Path):
+    """Copy a cached result's files into output_path and return its paths, or None on a miss."""
+    entry = Path(RESULT_CACHE_DIR) / key
+    manifest_path = entry / "result.json"
+    if not manifest_path.exists():
+        return None
+    try:
+        manifest = json.loads(manifest_path.read_text())
+        files = {}
+        for name, filename in manifest["files"].items():
+            # A sidecar left there describes the old file, not the restored one
+            (output_path / filename).with_suffix(".meta.json").unlink(missing_ok=True)
+            shutil.copyfile(entry / filename, output_path / filename)
+            files[name] = str(output_path / filename)
+        # Copied last: the sidecars stored with the parts, so the next tweak
+        # to the design still reuses the restored lid / tray / bracket
+        for sidecar in entry.glob("*.meta.json"):
+            shutil.copyfile(sidecar, output_path / sidecar.name)
+        result = EnclosureResult(files, tuple(manifest["inner_bbox"]))
+        os.utime(entry)  # mark as recently used
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning("Ignoring unreadable result cache entry %s: %s", key, e)
+        return None
+    return result
+
+
+def _store_result(key: str, result: EnclosureResult) -> None:
+    """Copy a freshly generated result into the cache; best-effort, so failures are only logged."""
+    cache_dir = Path(RESULT_CACHE_DIR)
+    files = {name: Path(path).name for name, path in result.items()}
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # Fill a temporary directory and rename it, so readers never see a partial entry
+        tmp = Path(tempfile.mkdtemp(dir=cache_dir, prefix=".tmp-"))
+        try:
+            for name, filename in files.items():
+                shutil.copyfile(result[name], tmp / filename)
+                sidecar = Path(result[name]).with_suffix(".meta.json")
+                if sidecar.exists():
+                    shutil.copyfile(sidecar, tmp / sidecar.name)
+            manifest = {"files": files, "inner_bbox": list(result.inner_bbox)}
+            (tmp / "result.json").write_text(json.dumps(manifest))
+            os.replace(tmp, cache_dir / key)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        entries = sorted(
+            (p for p in cache_dir.iterdir() if p.is_dir() and not p.name.startswith(".")),
+            key=lambda p: p.stat().st_mtime, reverse=True,
+        )
+        for stale in entries[RESULT_CACHE_ENTRIES:]:
+            shutil.rmtree(stale, ignore_errors=True)
+    except OSError as e:
+        logger.warning("Could not write result cache: %s", e)
+
+
+# Per wall face: sketch plane, and the axis that a custom cutout's rotation
+# turns about.
+_CUTOUT_FACES = {
+    WallFace.FRONT: ("XZ", (0, 1, 0)),
+    WallFace.BACK: ("XZ", (0, 1, 0)),
+    WallFace.RIGHT: ("YZ", (1, 0, 0)),
+    WallFace.LEFT: ("YZ", (1, 0, 0)),
+    WallFace.TOP: ("XY", (0, 0, 1)),
+    WallFace.BOTTOM: ("XY", (0, 0, 1)),
+}
+
+
+def _face_origins(inner_size: Vector3, wt: float, ic: Vector3, top_z: float) -> dict:
+    """
+    Cutter origin of each face in its sketch plane's local (x, y, z), before
+    the cutout's own offset_x / offset_y. Computed once per set of cutouts.
+    """
+    return {
+        WallFace.FRONT: (ic.x, ic.z, ic.y + inner_size.y / 2 + wt / 2),
+        WallFace.BACK: (ic.x, ic.z, ic.y - inner_size.y / 2 - wt / 2),
+        WallFace.RIGHT: (ic.y, ic.z, ic.x + inner_size.x / 2 + wt / 2),
+        WallFace.LEFT: (ic.y, ic.z, ic.x - inner_size.x / 2 - wt / 2),
+        # Top cuts down from the rim, bottom up from the floor
+        WallFace.TOP: (ic.x, ic.y, top_z),
+        WallFace.BOTTOM: (ic.x, ic.y, 0),
+    }
+
+
+# World (x_dir, y_dir, normal) rows of each sketch plane. Named planes sit at
+# the origin, so a local offset maps to world coordinates with one matrix
+# product instead of constructing a cq.Plane per cutout.
+_PLANE_AXES = {
+    name: np.array([plane.xDir.toTuple(), plane.yDir.toTuple(), plane.zDir.toTuple()])
+    for name, plane in _PLANES.items()
+}
+
+
+def _cutter_origins(
+    cutouts: list,
     inner_size: Vector3,
     wall_thickness: float,
     inner_center: Vector3,
     outer_h: float = None,
-) -> cq.Workplane:
-    """Apply a single connector cutout to the shell."""
+) -> list:
+    """
+    World placement (x, y, z) of each cutout, or None where the face is
+    unknown or the offsets are unusable. Each cutout only adds its offsets to
+    its face's precomputed origin; the plane transforms for all cutouts are
+    done in one pass.
+    """
+    top_z = outer_h if outer_h is not None else inner_center.z + inner_size.z / 2
+    face_origins = _face_origins(inner_size, wall_thickness, inner_center, top_z)
+    rows, local, axes = [], [], []
+    for i, cutout in enumerate(cutouts):
+        base = face_origins.get(cutout.face)
+        if base is None:
+            continue
+        try:
+            offset = (base[0] + cutout.offset_x, base[1] + cutout.offset_y, base[2])
+        except TypeError as e:
+            logger.warning("Could not place cutout on %s: %s", cutout.face, e)
+            continue
+        rows.append(i)
+        local.append(offset)
+        axes.append(_PLANE_AXES[_CUTOUT_FACES[cutout.face][0]])
+
+    origins = [None] * len(cutouts)
+    if rows:
+        world = np.einsum("ni,nij->nj", np.array(local, dtype=np.float64), np.array(axes))
+        for i, xyz in zip(rows, world.tolist()):
+            origins[i] = tuple(xyz)
+    return origins
+
+
+@functools.lru_cache(maxsize=128)
+def _cutter_solid(
+    face: WallFace, rotation: float, sketch: tuple, cut_d: float, midplane: bool = True,
+) -> cq.Shape:
+    """
+    Cutter solid centred on the origin, oriented for the given face. Cached on
+    scalars only, so repeated identical cutouts (say two USB-C ports on one
+    wall) are built once and just placed; callers must not modify the result.
+    sketch is ("circle", r), ("rect", w, h) or ("polygon", sides, r).
+    midplane: the origin is the midplane of a flat side wall and cut_d is the
+    automatic depth (the wall plus a 1 mm margin each side), so an unrotated
+    cutter only needs to be cut_d long in total. Top and bottom cuts start at
+    a surface, a rotation tilts a side cutter through the wall, a user-given
+    depth is a reach from the anchor, and wrapper walls can be set back from
+    the bounding-box plane, so those still extrude cut_d to either side.
+    """
+    plane, axis = _CUTOUT_FACES[face]
+    wp = cq.Workplane(_PLANES[plane]).transformed(rotate=tuple(rotation * a for a in axis))
+    centered = midplane and not rotation and face not in (WallFace.TOP, WallFace.BOTTOM)
+    if centered:
+        wp = wp.workplane(offset=-cut_d / 2)
+    kind = sketch[0]
+    if kind == "circle":
+        wp = wp.circle(sketch[1])
+    elif kind == "polygon":
+        wp = wp.polygon(sketch[1], sketch[2])
+    else:
+        wp = wp.rect(sketch[1], sketch[2])
+    return wp.extrude(cut_d, both=not centered).val()
+
+
+@functools.lru_cache(maxsize=64)
+def _connector_sketch(connector_type: str, custom_width, custom_height) -> tuple:
+    """
+    Cutter sketch tuple for a connector (see _cutter_solid), resolved from its
+    profile once per (type, custom size) instead of once per cutout.
+    """
+    profile = get_profile(connector_type)
+    cut_w = profile.get("width", custom_width or 10)
+    cut_h = profile.get("height", custom_height or 10)
 
-    profile = get_profile(cutout.connector_type.value)
-    is_round = profile.get("is_round", False)
+    if profile.get("is_round", False):
+        return ("circle", profile.get("diameter", min(cut_w, cut_h)) / 2)
+    return ("rect", cut_w, cut_h)
 
-    cut_w = profile.get("width", cutout.custom_width or 10)
-    cut_h = profile.get("height", cutout.custom_height or 10)
+
+def _connector_cutter(
+    cutout: ConnectorCutout, origin: tuple, wall_thickness: float, planar_walls: bool = True,
+) -> cq.Shape:
+    """Build the cutter solid for a single connector cutout placed at origin."""
+    sketch = _connector_sketch(cutout.connector_type.value, cutout.custom_width, cutout.custom_height)
     cut_d = wall_thickness + 2  # slightly deeper than wall to ensure clean cut
+    cutter = _cutter_solid(cutout.face, 0.0, sketch, cut_d, planar_walls)
+    return cutter.moved(cq.Location(cq.Vector(*origin)))
+
+
+# Cutter sketch (see _cutter_solid) of each custom cutout shape from its
+# (width, height); unknown shapes are cut as rectangles
+_CUSTOM_SKETCHES = {
+    CustomCutoutShape.RECTANGLE: lambda w, h: ("rect", w, h),
+    CustomCutoutShape.CIRCLE: lambda w, h: ("circle", w / 2),
+    CustomCutoutShape.HEXAGON: lambda w, h: ("polygon", 6, w / 2),
+    CustomCutoutShape.TRIANGLE: lambda w, h: ("polygon", 3, w / 2),
+}
+
+
+def _custom_cutter(
+    cutout: CustomCutout, origin: tuple, wall_thickness: float, planar_walls: bool = True,
+) -> cq.Shape:
+    """Build the cutter solid for a single custom cutout placed at origin."""
+    sketch = _CUSTOM_SKETCHES.get(cutout.shape, _CUSTOM_SKETCHES[CustomCutoutShape.RECTANGLE])(cutout.width, cutout.height)
+    auto_depth = cutout.depth <= 0
+    cut_d = wall_thickness + 2 if auto_depth else cutout.depth
+    cutter = _cutter_solid(cutout.face, cutout.rotation, sketch, cut_d, planar_walls and auto_depth)
+    return cutter.moved(cq.Location(cq.Vector(*origin)))
+
+
+# With at least this many cutters, cutouts are subtracted per wall face
+# instead of all at once, so each boolean only touches one wall's faces.
+CUTOUT_FACE_SPLIT = 10
+
+
+def _bbox_overlap(a: cq.BoundBox, b: cq.BoundBox) -> bool:
+    """True if two bounding boxes intersect (touching does not count)."""
+    return (
+        a.xmin < b.xmax and b.xmin < a.xmax
+        and a.ymin < b.ymax and b.ymin < a.ymax
+        and a.zmin < b.zmax and b.zmin < a.zmax
+    )
 
-    face = cutout.face
-    offset_x = cutout.offset_x
-    offset_y = cutout.offset_y
-
-    # Determine position and orientation based on face
-    if face == WallFace.FRONT:
-        pos_x = inner_center.x + offset_x
-        pos_y = inner_center.y + inner_size.y / 2 + wall_thickness / 2
-        pos_z = inner_center.z + offset_y
-        wp = cq.Workplane("XZ").transformed(offset=(pos_x, pos_z, pos_y))
-        if is_round:
-            cut = wp.circle(profile["diameter"] / 2).extrude(cut_d, both=True)
-        else:
-            cut = wp.rect(cut_w, cut_h).extrude(cut_d, both=True)
-
-    elif face == WallFace.BACK:
-        pos_x = inner_center.x + offset_x
-        pos_y = inner_center.y - inner_size.y / 2 - wall_thickness / 2
-        pos_z = inner_center.z + offset_y
-        wp = cq.Workplane("XZ").transformed(offset=(pos_x, pos_z, pos_y))
-        if is_round:
-            cut = wp.circle(profile["diameter"] / 2).extrude(cut_d, both=True)
-        else:
-            cut = wp.rect(cut_w, cut_h).extrude(cut_d, both=True)
-
-    elif face == WallFace.RIGHT:
-        pos_x = inner_center.x + inner_size.x / 2 + wall_thickness / 2
-        pos_y = inner_center.y + offset_x
-        pos_z = inner_center.z + offset_y
-        wp = cq.Workplane("YZ").transformed(offset=(pos_y, pos_z, pos_x))
-        if is_round:
-            cut = wp.circle(profile["diameter"] / 2).extrude(cut_d, both=True)
-        else:
-            cut = wp.rect(cut_w, cut_h).extrude(cut_d, both=True)
-
-    elif face == WallFace.LEFT:
-        pos_x = inner_center.x - inner_size.x / 2 - wall_thickness / 2
-        pos_y = inner_center.y + offset_x
-        pos_z = inner_center.z + offset_y
-        wp = cq.Workplane("YZ").transformed(offset=(pos_y, pos_z, pos_x))
-        if is_round:
-            cut = wp.circle(profile["diameter"] / 2).extrude(cut_d, both=True)
-        else:
-            cut = wp.rect(cut_w, cut_h).extrude(cut_d, both=True)
-
-    elif face == WallFace.TOP:
-        # Cut from the top of the enclosure downward (-Z)
-        pos_x = inner_center.x + offset_x
-        pos_y = inner_center.y + offset_y
-        pos_z = outer_h if outer_h is not None else inner_center.z + inner_size.z / 2
-        wp = cq.Workplane("XY").transformed(offset=(pos_x, pos_y, pos_z))
-        r = profile.get("diameter", min(cut_w, cut_h)) / 2
-        if is_round:
-            cut = wp.circle(r).extrude(cut_d, both=True)
-        else:
-            cut = wp.rect(cut_w, cut_h).extrude(cut_d, both=True)
-
-    elif face == WallFace.BOTTOM:
-        # Cut from the floor upward (+Z)
-        pos_x = inner_center.x + offset_x
-        pos_y = inner_center.y + offset_y
-        pos_z = 0
-        wp = cq.Workplane("XY").transformed(offset=(pos_x, pos_y, pos_z))
-        r = profile.get("diameter", min(cut_w, cut_h)) / 2
-        if is_round:
-            cut = wp.circle(r).extrude(cut_d, both=True)
-        else:
-            cut = wp.rect(cut_w, cut_h).extrude(cut_d, both=True)
 
-    else:
-        return shell
+def _cut_all(shell: cq.Workplane, cutters: list) -> cq.Workplane:
+    """Subtract cutter shapes in one boolean, falling back to one cut per cutter."""
+    try:
+        return shell.cut(cq.Workplane(_XY).add(cutters))
+    except Exception as e:
+        logger.warning("Batched cutout failed (%s), applying cutouts one by one", e)
 
-    shell = shell.cut(cut)
+    for cut in cutters:
+        try:
+            shell = shell.cut(cut)
+        except Exception as e:
+            logger.warning("Could not apply cutout: %s", e)
     return shell
 
 
-def _apply_custom_cutout(
+def _apply_cutouts(
     shell: cq.Workplane,
-    cutout: CustomCutout,
+    cutouts: list,
+    custom_cutouts: list,
     inner_size: Vector3,
     wall_thickness: float,
     inner_center: Vector3,
     outer_h: float = None,
+    extra_cutters: list = (),
+    planar_walls: bool = True,
 ) -> cq.Workplane:
-    """Apply a single custom cutout to the shell."""
-    w = cutout.width
-    h = cutout.height
-    cut_d = cutout.depth if cutout.depth > 0 else wall_thickness + 2
-    face = cutout.face
-    shape = cutout.shape
-    rot = cutout.rotation
-
-    def make_profile(wp, shape, w, h):
-        if shape == CustomCutoutShape.RECTANGLE:
-            return wp.rect(w, h)
-        elif shape == CustomCutoutShape.CIRCLE:
-            return wp.circle(w / 2)
-        elif shape == CustomCutoutShape.HEXAGON:
-            return wp.polygon(6, w / 2)
-        elif shape == CustomCutoutShape.TRIANGLE:
-            return wp.polygon(3, w / 2)
-        else:
-            return wp.rect(w, h)
-
-    try:
-        if face == WallFace.FRONT:
-            pos_x = inner_center.x + cutout.offset_x
-            pos_y = inner_center.y + inner_size.y / 2 + wall_thickness / 2
-            pos_z = inner_center.z + cutout.offset_y
-            wp = cq.Workplane("XZ").transformed(offset=(pos_x, pos_z, pos_y), rotate=(0, rot, 0))
-            cut = make_profile(wp, shape, w, h).extrude(cut_d, both=True)
-
-        elif face == WallFace.BACK:
-            pos_x = inner_center.x + cutout.offset_x
-            pos_y = inner_center.y - inner_size.y / 2 - wall_thickness / 2
-            pos_z = inner_center.z + cutout.offset_y
-            wp = cq.Workplane("XZ").transformed(offset=(pos_x, pos_z, pos_y), rotate=(0, rot, 0))
-            cut = make_profile(wp, shape, w, h).extrude(cut_d, both=True)
-
-        elif face == WallFace.RIGHT:
-            pos_x = inner_center.x + inner_size.x / 2 + wall_thickness / 2
-            pos_y = inner_center.y + cutout.offset_x
-            pos_z = inner_center.z + cutout.offset_y
-            wp = cq.Workplane("YZ").transformed(offset=(pos_y, pos_z, pos_x), rotate=(rot, 0, 0))
-            cut = make_profile(wp, shape, w, h).extrude(cut_d, both=True)
-
-        elif face == WallFace.LEFT:
-            pos_x = inner_center.x - inner_size.x / 2 - wall_thickness / 2
-            pos_y = inner_center.y + cutout.offset_x
-            pos_z = inner_center.z + cutout.offset_y
-            wp = cq.Workplane("YZ").transformed(offset=(pos_y, pos_z, pos_x), rotate=(rot, 0, 0))
-            cut = make_profile(wp, shape, w, h).extrude(cut_d, both=True)
-
-        elif face == WallFace.TOP:
-            pos_x = inner_center.x + cutout.offset_x
-            pos_y = inner_center.y + cutout.offset_y
-            pos_z = outer_h if outer_h is not None else inner_center.z + inner_size.z / 2
-            wp = cq.Workplane("XY").transformed(offset=(pos_x, pos_y, pos_z), rotate=(0, 0, rot))
-            cut = make_profile(wp, shape, w, h).extrude(cut_d, both=True)
-
-        elif face == WallFace.BOTTOM:
-            pos_x = inner_center.x + cutout.offset_x
-            pos_y = inner_center.y + cutout.offset_y
-            pos_z = 0
-            wp = cq.Workplane("XY").transformed(offset=(pos_x, pos_y, pos_z), rotate=(0, 0, rot))
-            cut = make_profile(wp, shape, w, h).extrude(cut_d, both=True)
-
-        else:
-            return shell
-
-        shell = shell.cut(cut)
-    except Exception as e:
-        print(f"Warning: Could not apply custom cutout ({shape}): {e}")
+    """
+    Apply all connector and custom cutouts to the shell.
+    Cutters are collected first and subtracted in a single boolean (each
+    cutter is a separate tool, so overlapping cutouts are fine). Large sets
+    are split into one boolean per wall face. extra_cutters (already placed
+    shapes, e.g. screw holes) join the same boolean instead of costing
+    their own. planar_walls=False is for shells whose side walls can sit
+    inside the bounding-box wall plane (the wrapper): cutters then reach a
+    full cut depth to either side of that plane.
+    """
+    origins = _cutter_origins(
+        list(cutouts) + list(custom_cutouts),
+        inner_size, wall_thickness, inner_center, outer_h,
+    )
+    by_face = {}
+    for cutout, origin in zip(cutouts, origins):
+        if origin is None:
+            continue
+        try:
+            cut = _connector_cutter(cutout, origin, wall_thickness, planar_walls)
+        except Exception as e:
+            logger.warning("Could not apply cutout %s: %s", cutout.connector_type, e)
+            continue
+        by_face.setdefault(cutout.face, []).append(cut)
+    for cutout, origin in zip(custom_cutouts, origins[len(cutouts):]):
+        if origin is None:
+            continue
+        try:
+            cut = _custom_cutter(cutout, origin, wall_thickness, planar_walls)
+        except Exception as e:
+            logger.warning("Could not apply custom cutout (%s): %s", cutout.shape, e)
+            continue
+        by_face.setdefault(cutout.face, []).append(cut)
+    if extra_cutters:
+        by_face[None] = list(extra_cutters)  # not tied to a wall face
+
+    # Cutters that miss the shell entirely (offset past the wall) would only
+    # cost an empty boolean, so drop them up front
+    shell_bb = shell.val().BoundingBox()
+    for face, group in by_face.items():
+        by_face[face] = [cut for cut in group if _bbox_overlap(cut.BoundingBox(), shell_bb)]
+
+    count = sum(len(group) for group in by_face.values())
+    if count == 0:
+        return shell
+    if count < CUTOUT_FACE_SPLIT:
+        return _cut_all(shell, [cut for group in by_face.values() for cut in group])
 
+    for group in by_face.values():
+        shell = _cut_all(shell, group)
     return shell
 
 
@@ -349,64 +796,53 @@ def _apply_enclosure_style(
         slot_z = outer_h / 2
         spacing = 8.0
 
-        # Front/back walls — slots along X
-        for y_sign in [1, -1]:
-            wall_y = y_sign * outer_d / 2
-            x = -outer_w / 2 + 4.0
-            while x < outer_w / 2 - 4.0:
-                try:
-                    slot = (
-                        cq.Workplane("XY")
-                        .box(slot_w, wall + 2, slot_h)
-                        .translate((x, wall_y, slot_z))
-                    )
-                    base = base.cut(slot)
-                except Exception:
-                    pass
-                x += spacing
-
-        # Left/right walls — slots along Y
-        for x_sign in [1, -1]:
-            wall_x = x_sign * outer_w / 2
-            y = -outer_d / 2 + 4.0
-            while y < outer_d / 2 - 4.0:
-                try:
-                    slot = (
-                        cq.Workplane("XY")
-                        .box(wall + 2, slot_w, slot_h)
-                        .translate((wall_x, y, slot_z))
-                    )
-                    base = base.cut(slot)
-                except Exception:
-                    pass
-                y += spacing
+        # Slot centres from 4 mm inside each end, computed rather than
+        # accumulated so long walls don't drift
+        xs = np.arange(-outer_w / 2 + 4.0, outer_w / 2 - 4.0, spacing).tolist()
+        ys = np.arange(-outer_d / 2 + 4.0, outer_d / 2 - 4.0, spacing).tolist()
+        slots = [
+            # Front/back walls — slots along X
+            _box(slot_w, wall + 2, slot_h, (x, y_sign * outer_d / 2, slot_z))
+            for y_sign in (1, -1) for x in xs
+        ] + [
+            # Left/right walls — slots along Y
+            _box(wall + 2, slot_w, slot_h, (x_sign * outer_w / 2, y, slot_z))
+            for x_sign in (1, -1) for y in ys
+        ]
+
+        if slots:
+            base = _cut_all(base, slots)
 
     elif style == "ribbed":
         rib_h = 3.0
         rib_d = 1.5
         rib_spacing = 15.0
-        z = floor + rib_h / 2
-        while z < outer_h - rib_h / 2:
+        ribs = []
+        for z in np.arange(floor + rib_h / 2, outer_h - rib_h / 2, rib_spacing).tolist():
+            # Front/back ribs
+            for y_side in [1, -1]:
+                ribs.append(_box(
+                    outer_w + rib_d * 2, rib_d, rib_h,
+                    (0, y_side * (outer_d / 2 + rib_d / 2), z),
+                ))
+            # Left/right ribs
+            for x_side in [1, -1]:
+                ribs.append(_box(
+                    rib_d, outer_d + rib_d * 2, rib_h,
+                    (x_side * (outer_w / 2 + rib_d / 2), 0, z),
+                ))
+
+        # All ribs in one fuse (separate tools, so the corner overlaps are fine)
+        if ribs:
             try:
-                # Front/back ribs
-                for y_side in [1, -1]:
-                    rib = (
-                        cq.Workplane("XY")
-                        .box(outer_w + rib_d * 2, rib_d, rib_h)
-                        .translate((0, y_side * (outer_d / 2 + rib_d / 2), z))
-                    )
-                    base = base.union(rib)
-                # Left/right ribs
-                for x_side in [1, -1]:
-                    rib = (
-                        cq.Workplane("XY")
-                        .box(rib_d, outer_d + rib_d * 2, rib_h)
-                        .translate((x_side * (outer_w / 2 + rib_d / 2), 0, z))
-                    )
-                    base = base.union(rib)
-            except Exception:
-                pass
-            z += rib_spacing
+                base = base.union(cq.Workplane(_XY).add(ribs))
+            except Exception as e:
+                logger.warning("Batched ribs failed (%s), adding them one by one", e)
+                for rib in ribs:
+                    try:
+                        base = base.union(rib)
+                    except Exception as e:
+                        logger.warning("Could not add rib: %s", e)
 
     return base
 
@@ -419,54 +855,53 @@ def _add_pcb_standoffs(
     floor: float,
 ) -> cq.Workplane:
     """Add PCB standoffs for components with is_pcb=True."""
-    for comp in components:
-        if not comp.is_pcb:
-            continue
-        gz = comp.ground_z
-        if gz <= 0:
-            continue
-
-        outer_r = comp.pcb_screw_diameter * 2.5 / 2
-        inner_r = comp.pcb_screw_diameter / 2
-        standoff_h = gz
-
-        # Component center in CadQuery XY space
-        cq_cx = comp.position.x - cavity_center_x
-        cq_cy = comp.position.y - cavity_center_y
-
+    pcbs = [comp for comp in components if comp.is_pcb and comp.ground_z > 0]
+    if not pcbs:
+        return base
+
+    # Centres (in CadQuery XY space) and auto-placement corners for every PCB
+    # at once: 4 corners inset 3mm from the component edges, at least 1mm out
+    extents = np.array([
+        (comp.position.x, comp.position.y,
+         comp.bbox_max.x - comp.bbox_min.x, comp.bbox_max.y - comp.bbox_min.y)
+        for comp in pcbs
+    ])
+    centers = extents[:, :2] - (cavity_center_x, cavity_center_y)
+    half = np.maximum(extents[:, 2:] / 2 - 3.0, 1.0)
+    corners = (centers[:, None, :] + half[:, None, :] * _CORNER_SIGNS).tolist()
+
+    pairs = []  # ((x, y), standoff, drill)
+    for comp, (cq_cx, cq_cy), auto in zip(pcbs, centers.tolist(), corners):
         if comp.standoff_positions:
             positions = [(p["x"] + cq_cx, p["y"] + cq_cy) for p in comp.standoff_positions]
         else:
-            # Auto-place at 4 corners, inset 3mm from component edges
-            half_w = (comp.bbox_max.x - comp.bbox_min.x) / 2
-            half_d = (comp.bbox_max.y - comp.bbox_min.y) / 2
-            inset = 3.0
-            hw = max(half_w - inset, 1.0)
-            hd = max(half_d - inset, 1.0)
-            positions = [
-                (cq_cx + hw, cq_cy + hd),
-                (cq_cx + hw, cq_cy - hd),
-                (cq_cx - hw, cq_cy + hd),
-                (cq_cx - hw, cq_cy - hd),
-            ]
-
-        for (sx, sy) in positions:
+            positions = auto
+
+        # One standoff/drill pair per component, placed by location
+        standoff_h = comp.ground_z
+        z = floor + standoff_h / 2
+        standoff_proto = _cylinder_compound([(0, 0, z)], standoff_h, comp.pcb_screw_diameter * 2.5 / 2)
+        drill_proto = _cylinder_compound([(0, 0, z)], standoff_h + 1, comp.pcb_screw_diameter / 2)
+        for sx, sy in positions:
+            loc = cq.Location(cq.Vector(sx, sy, 0))
+            pairs.append(((sx, sy), standoff_proto.moved(loc), drill_proto.moved(loc)))
+
+    # Every component's standoffs in one union, then all drills in one cut
+    # (so no standoff can fill another component's hole)
+    try:
+        base = base.union(cq.Workplane(_XY).add([standoff for _, standoff, _ in pairs]))
+    except Exception as e:
+        logger.warning("Batched PCB standoffs failed (%s), adding them one by one", e)
+        placed = []
+        for (sx, sy), standoff, drill in pairs:
             try:
-                standoff = (
-                    cq.Workplane("XY")
-                    .cylinder(standoff_h, outer_r)
-                    .translate((sx, sy, floor + standoff_h / 2))
-                )
-                drill = (
-                    cq.Workplane("XY")
-                    .cylinder(standoff_h + 1, inner_r)
-                    .translate((sx, sy, floor + standoff_h / 2))
-                )
-                base = base.union(standoff).cut(drill)
+                base = base.union(standoff)
+                placed.append(((sx, sy), standoff, drill))
             except Exception as e:
-                print(f"Warning: PCB standoff skipped at ({sx:.1f},{sy:.1f}): {e}")
+                logger.warning("PCB standoff skipped at (%.1f,%.1f): %s", sx, sy, e)
+        pairs = placed  # no drill for a standoff that isn't there
 
-    return base
+    return _cut_all(base, [drill for _, _, drill in pairs])
 
 
 def _build_lid_screws(
@@ -484,96 +919,176 @@ def _build_lid_screws(
     if lid_style != "screws":
         return lid
 
-    inset = boss_diameter / 2 + wall
-
-    for sx, sy in [(1, 1), (1, -1), (-1, 1), (-1, -1)]:
-        bx = sx * (inner_w / 2 - inset)
-        by = sy * (inner_d / 2 - inset)
-
-        if lid_hole_style == "closed":
-            pass  # no hole
-
-        elif lid_hole_style == "countersunk":
-            # Wider pocket at top for screw head, then narrow shaft
-            head_r = screw_r * 1.8
-            pocket_depth = min(2.0, lid_t - 0.5)
-            shaft_depth = lid_t - pocket_depth - 0.3  # leave 0.3mm floor
-            if shaft_depth <= 0:
-                # lid too thin, fall back to through
-                hole = (
-                    cq.Workplane("XY")
-                    .cylinder(lid_t + 1, screw_r)
-                    .translate((bx, by, lid_t / 2))
-                )
-                lid = lid.cut(hole)
-            else:
-                # Countersink pocket from top
-                pocket = (
-                    cq.Workplane("XY")
-                    .cylinder(pocket_depth + 1, head_r)
-                    .translate((bx, by, lid_t - pocket_depth / 2))
-                )
-                # Shaft hole from bottom (not breaking through)
-                shaft = (
-                    cq.Workplane("XY")
-                    .cylinder(shaft_depth + 1, screw_r)
-                    .translate((bx, by, shaft_depth / 2))
-                )
-                lid = lid.cut(pocket).cut(shaft)
-
-        else:  # "through" — default
-            hole = (
-                cq.Workplane("XY")
-                .cylinder(lid_t + 1, screw_r)
-                .translate((bx, by, lid_t / 2))
-            )
-            lid = lid.cut(hole)
+    if lid_hole_style == "closed":
+        return lid  # no holes
 
-    return lid
+    inset = boss_diameter / 2 + wall
+    x, y = inner_w / 2 - inset, inner_d / 2 - inset
+
+    if lid_hole_style == "countersunk":
+        # Wider pocket at top for screw head, then narrow shaft
+        head_r = screw_r * 1.8
+        pocket_depth = min(2.0, lid_t - 0.5)
+        shaft_depth = lid_t - pocket_depth - 0.3  # leave 0.3mm floor
+        if shaft_depth > 0:
+            # Countersink pockets from top
+            pockets = _corner_cylinders(x, y, lid_t - pocket_depth / 2, pocket_depth + 1, head_r)
+            # Shaft holes from bottom (not breaking through)
+            shafts = _corner_cylinders(x, y, shaft_depth / 2, shaft_depth + 1, screw_r)
+            # Pockets and shafts overlap, so pass them as separate tools of one cut
+            return lid.newObject([lid.findSolid().cut(pockets, shafts).clean()])
+        # lid too thin, fall back to through
+
+    # "through" — default
+    return lid.cut(_corner_cylinders(x, y, lid_t / 2, lid_t + 1, screw_r))
 
 
 def _get_part(config: EnclosureConfig, part_name: str) -> PartConfig:
     """Get part config, falling back to defaults if not present."""
     parts = config.parts
-    if isinstance(parts, dict):
-        return parts.get(part_name, PartConfig())
-    return PartConfig()
+    part = parts.get(part_name) if isinstance(parts, dict) else None
+    # Only build the default when it's needed
+    return part if part is not None else PartConfig()
 
 
-def _apply_edges(shell: cq.Workplane, part_config: PartConfig, fillet_r: float) -> cq.Workplane:
-    """Apply fillet or chamfer to vertical edges based on part config."""
-    edge_style = getattr(part_config, "edge_style", "fillet")
-    chamfer_size = getattr(part_config, "chamfer_size", 1.5)
+# Radii below this are treated as "no fillet" (sharp edges)
+_MIN_EDGE_SIZE = 1e-6
 
-    if edge_style == "fillet" and fillet_r > 0:
-        try:
-            shell = shell.edges("|Z").fillet(fillet_r)
-        except Exception:
-            pass
-    elif edge_style == "chamfer" and chamfer_size > 0:
-        try:
-            shell = shell.edges("|Z").chamfer(chamfer_size)
-        except Exception:
-            pass
-    # "none": no edge treatment
-    return shell
+
+@functools.lru_cache(maxsize=64)
+def _footprint_face(
+    w: float,
+    d: float,
+    footprint_key: tuple,
+    edge_style: str,
+    chamfer_size: float,
+    fillet_r: float,
+) -> cq.Face:
+    """
+    Footprint as a planar face with its corners rounded (or chamfered) in 2D.
+    Extruding this gives the same vertical-edge treatment as a 3D fillet on
+    the "|Z" edges, without the cost of BRepFilletAPI_MakeFillet.
+    Cached, so the base shell and a lid with the same edge settings extrude
+    the very same face; callers must not modify it.
+    """
+    face = cq.Face.makeFromWires(_footprint_wire(w, d, footprint_key))
+    # Each corner eats up to one radius (or chamfer) of both adjacent edges,
+    # so if the shortest edge can't take two, keep the corners sharp instead
+    # of letting OCCT fail on the attempt
+    shortest = min(e.Length() for e in face.Edges())
+    if edge_style == "fillet" and _MIN_EDGE_SIZE < fillet_r < shortest / 2:
+        face = face.fillet2D(fillet_r, face.Vertices())
+    elif edge_style == "chamfer" and _MIN_EDGE_SIZE < chamfer_size < shortest / 2:
+        face = face.chamfer2D(chamfer_size, face.Vertices())
+    return face
+
+
+@functools.lru_cache(maxsize=64)
+def _hollow_shell_shape(
+    outer_w: float,
+    outer_d: float,
+    outer_h: float,
+    inner_w: float,
+    inner_d: float,
+    inner_h: float,
+    floor: float,
+    footprint_key: tuple,
+    edge_style: str,
+    chamfer_size: float,
+    fillet_r: float,
+) -> cq.Shape:
+    """Cached worker for _build_hollow_shell; all arguments are hashable."""
+    edges = (edge_style, chamfer_size, fillet_r)
+
+    outer_face = _footprint_face(outer_w, outer_d, footprint_key, *edges)
+    shell = cq.Solid.extrudeLinear(outer_face, cq.Vector(0, 0, outer_h))
+
+    # One boolean: the cavity prism cut from the outer prism. Measured against
+    # the alternatives, this is the cheapest for every footprint: hollowing
+    # with a thick-solid offset (MakeThickSolid) takes about 2x as long, and
+    # extruding a ring face for the walls onto a floor slab still needs a fuse,
+    # takes 4-5x as long and is an invalid solid for the U footprint.
+    cavity_face = _footprint_face(inner_w, inner_d, footprint_key, *edges).translate(cq.Vector(0, 0, floor))
+    cavity = cq.Solid.extrudeLinear(cavity_face, cq.Vector(0, 0, inner_h))
+    return shell.cut(cavity)
+
+
+def _build_hollow_shell(
+    outer_w: float,
+    outer_d: float,
+    outer_h: float,
+    inner_w: float,
+    inner_d: float,
+    inner_h: float,
+    floor: float,
+    footprint: FootprintConfig,
+    edge_style: str,
+    chamfer_size: float,
+    fillet_r: float,
+) -> cq.Workplane:
+    """
+    Build the open-top base shell: footprint extrusion minus the cavity, with
+    vertical edges treated. Memoized on the (0.01 mm rounded) dimensions, since
+    repeated generations usually only change cutouts and standoffs.
+    """
+    shape = _hollow_shell_shape(
+        round(outer_w, 2), round(outer_d, 2), round(outer_h, 2),
+        round(inner_w, 2), round(inner_d, 2), round(inner_h, 2),
+        round(floor, 2),
+        _footprint_key(footprint),
+        edge_style,
+        chamfer_size,
+        round(fillet_r, 2),
+    )
+    # Hand out a copy so callers never share topology with the cache
+    return cq.Workplane(_XY).add(shape.copy())
+
+
+def _build_lid_plate(
+    outer_w: float,
+    outer_d: float,
+    lid_t: float,
+    footprint: FootprintConfig,
+    edge_style: str,
+    chamfer_size: float,
+    fillet_r: float,
+) -> cq.Workplane:
+    """
+    Flat lid plate: a single prism of the footprint face, with the vertical
+    edges already rounded or chamfered in 2D (no 3D fillet pass).
+    """
+    face = _footprint_face(
+        round(outer_w, 2), round(outer_d, 2), _footprint_key(footprint),
+        edge_style, chamfer_size, round(fillet_r, 2),
+    )
+    return cq.Workplane(_XY).add(cq.Solid.extrudeLinear(face, cq.Vector(0, 0, lid_t)))
 
 
-def generate_enclosure(config: EnclosureConfig, output_dir: str = "./output") -> dict:
+def generate_enclosure(config: EnclosureConfig, output_dir: str = "./output") -> EnclosureResult:
     """
     Main function: generate enclosure from config.
 
-    Returns paths to generated STL files:
+    Returns an EnclosureResult: paths to the generated STL files,
     {
         "base": "path/to/enclosure_base.stl",
         "lid": "path/to/enclosure_lid.stl"   (if lid_style != NONE)
         "tray": "path/to/enclosure_tray.stl" (if tray enabled)
         "bracket": "path/to/enclosure_bracket.stl" (if bracket enabled)
+        "assembly_3mf": "path/to/enclosure.3mf"  # all parts, assembled
     }
+    with the cavity dimensions (inner_w, inner_d, inner_h) in mm as .inner_bbox.
     """
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
 
+    # --- Unchanged design: reuse the files generated last time ---
+    cache_key = _result_key(config) if RESULT_CACHE_DIR else None
+    if cache_key:
+        cached = _restore_result(cache_key, output_path)
+        if cached is not None:
+            logger.info("Enclosure restored from cache: %s", cached)
+            return cached
+
     # --- Per-part config ---
     base_part = _get_part(config, "base")
     lid_part = _get_part(config, "lid")
@@ -592,9 +1107,14 @@ def generate_enclosure(config: EnclosureConfig, output_dir: str = "./output") ->
             eff_fillet = 3.0
 
     # --- 1. Load all components and compute bboxes ---
-    loaded = []
-    for comp in config.components:
-        loaded.append(load_component_bbox(comp))
+    # Model files are independent, so they are parsed concurrently; one worker
+    # per distinct file, since components sharing a file reuse its cached bbox
+    files = {comp.file_path for comp in config.components}
+    if len(files) > 1:
+        with ThreadPoolExecutor(max_workers=min(8, len(files))) as pool:
+            loaded = list(pool.map(load_component_bbox, config.components))
+    else:
+        loaded = [load_component_bbox(comp) for comp in config.components]
 
     # --- 2. Combined bounding box ---
     bbox_min, bbox_max = compute_combined_bbox(loaded)
@@ -624,60 +1144,36 @@ def generate_enclosure(config: EnclosureConfig, output_dir: str = "./output") ->
     boss_h = max(config.screw_length - lid_t, 3.0)
 
     # --- 3. Build the base shell using footprint ---
-    footprint = _build_footprint(outer_w, outer_d, config.footprint)
-    base = footprint.extrude(outer_h)
-
-    cavity_fp = _build_footprint(inner_w, inner_d, config.footprint)
-    cavity = cavity_fp.extrude(inner_h).translate((0, 0, floor))
-    base = base.cut(cavity)
-
-    base = _apply_edges(base, base_part, eff_fillet)
+    base = _build_hollow_shell(
+        outer_w, outer_d, outer_h, inner_w, inner_d, inner_h, floor,
+        config.footprint, base_part.edge_style, base_part.chamfer_size, eff_fillet,
+    )
 
     # --- 4. Add screw bosses (for SCREWS lid style, not minimal) ---
     if config.lid_style == LidStyle.SCREWS and style != "minimal":
-        boss_r = config.boss_diameter / 2
-        screw_r = config.screw_diameter / 2
-        inset = boss_r + wall
-
-        for sx, sy in [(1, 1), (1, -1), (-1, 1), (-1, -1)]:
-            bx = sx * (inner_w / 2 - inset)
-            by = sy * (inner_d / 2 - inset)
-            boss = (
-                cq.Workplane("XY")
-                .cylinder(boss_h, boss_r)
-                .translate((bx, by, floor + boss_h / 2))
-            )
-            screw_hole = (
-                cq.Workplane("XY")
-                .cylinder(boss_h + 1, screw_r)
-                .translate((bx, by, floor + boss_h / 2))
-            )
-            base = base.union(boss).cut(screw_hole)
+        base = _add_screw_bosses(
+            base, inner_w, inner_d, wall, floor, boss_h,
+            boss_r=config.boss_diameter / 2,
+            screw_r=config.screw_diameter / 2,
+        )
 
     # --- 5. Add PCB standoffs ---
     if config.pcb_standoffs_enabled:
         base = _add_pcb_standoffs(base, loaded, cavity_center_x, cavity_center_y, floor)
 
-    # --- 6. Apply connector cutouts to base ---
-    for cutout in config.cutouts:
-        try:
-            base = _apply_connector_cutout(base, cutout, inner_size, wall, inner_center, outer_h)
-        except Exception as e:
-            print(f"Warning: Could not apply cutout {cutout.connector_type}: {e}")
-
-    # --- 7. Apply custom cutouts to base ---
-    for cutout in config.custom_cutouts:
-        base = _apply_custom_cutout(base, cutout, inner_size, wall, inner_center, outer_h)
+    # --- 6-7. Apply connector and custom cutouts to base ---
+    base = _apply_cutouts(
+        base, config.cutouts, config.custom_cutouts,
+        inner_size, wall, inner_center, outer_h,
+    )
 
     # --- 8. Apply enclosure style (vented/ribbed) ---
     base = _apply_enclosure_style(base, style, outer_w, outer_d, outer_h, wall, floor)
 
-    # --- 9. Export base ---
-    base_path = output_path / "enclosure_base.stl"
-    _export_shape(base, base_path)
-    result = {"base": str(base_path)}
-    if (output_path / "enclosure_base.3mf").exists():
-        result["base_3mf"] = str(output_path / "enclosure_base.3mf")
+    # --- 9. Export finished parts in the background while the rest are built ---
+    tolerances = (config.export_tolerance, config.export_angular_tolerance)
+    exports = {}
+    _submit_export(exports, "base", base, output_path, tolerances=tolerances)
 
     # --- 10. Generate lid ---
     if config.lid_style != LidStyle.NONE:
@@ -688,44 +1184,39 @@ def generate_enclosure(config: EnclosureConfig, output_dir: str = "./output") ->
         if lid_part.style == "minimal":
             lid_fillet = 0.0
 
-        lid_fp = _build_footprint(outer_w, outer_d, config.footprint)
-
-        if config.lid_style == LidStyle.SCREWS:
-            lid = lid_fp.extrude(lid_t)
-            lid = _apply_edges(lid, lid_part, lid_fillet)
-
-            lid = _build_lid_screws(
-                lid,
-                lid_style="screws",
-                lid_hole_style=lid_hole_style,
-                lid_t=lid_t,
-                screw_r=config.screw_diameter / 2,
-                inner_w=inner_w,
-                inner_d=inner_d,
-                boss_diameter=config.boss_diameter,
-                wall=wall,
+        # Lids don't depend on cutouts or standoffs: reuse one already in output_dir
+        lid_key = _part_key(
+            "lid", outer_w, outer_d, lid_t, _footprint_key(config.footprint),
+            lid_part.edge_style, lid_part.chamfer_size, lid_fillet, config.lid_style, lid_hole_style,
+            config.screw_diameter, inner_w, inner_d, config.boss_diameter, wall, config.snap_depth,
+            tolerances,
+        )
+        if not _reuse_part(exports, "lid", lid_key, output_path):
+            lid = _build_lid_plate(
+                outer_w, outer_d, lid_t, config.footprint,
+                lid_part.edge_style, lid_part.chamfer_size, lid_fillet,
             )
 
-        elif config.lid_style == LidStyle.SNAP:
-            lid = lid_fp.extrude(lid_t)
-            rim_h = config.snap_depth * 2
-            rim = (
-                cq.Workplane("XY")
-                .box(inner_w, inner_d, rim_h)
-                .translate((0, 0, lid_t + rim_h / 2))
-            )
-            rim_inner = (
-                cq.Workplane("XY")
-                .box(inner_w - wall * 2, inner_d - wall * 2, rim_h + 1)
-                .translate((0, 0, lid_t + rim_h / 2))
-            )
-            lid = lid.union(rim).cut(rim_inner)
+            if config.lid_style == LidStyle.SCREWS:
+                lid = _build_lid_screws(
+                    lid,
+                    lid_style="screws",
+                    lid_hole_style=lid_hole_style,
+                    lid_t=lid_t,
+                    screw_r=config.screw_diameter / 2,
+                    inner_w=inner_w,
+                    inner_d=inner_d,
+                    boss_diameter=config.boss_diameter,
+                    wall=wall,
+                )
 
-        lid_path = output_path / "enclosure_lid.stl"
-        _export_shape(lid, lid_path)
-        result["lid"] = str(lid_path)
-        if (output_path / "enclosure_lid.3mf").exists():
-            result["lid_3mf"] = str(output_path / "enclosure_lid.3mf")
+            elif config.lid_style == LidStyle.SNAP:
+                rim_h = config.snap_depth * 2
+                rim = _box(inner_w, inner_d, rim_h, (0, 0, lid_t + rim_h / 2))
+                rim_inner = _box(inner_w - wall * 2, inner_d - wall * 2, rim_h + 1, (0, 0, lid_t + rim_h / 2))
+                lid = lid.union(rim, glue=True).cut(rim_inner)  # rim sits on the lid face
+
+            _submit_export(exports, "lid", lid, output_path, lid_key, tolerances)
 
     # --- 11. Generate tray (optional) ---
     if tray_part.enabled:
@@ -736,15 +1227,12 @@ def generate_enclosure(config: EnclosureConfig, output_dir: str = "./output") ->
         tray_w = inner_w - clearance * 2
         tray_d = inner_d - clearance * 2
 
-        tray = (
-            cq.Workplane("XY")
-            .box(tray_w, tray_d, tray_thickness)
-            .translate((0, 0, floor + tray_z + tray_thickness / 2))
-        )
-
-        tray_path = output_path / "enclosure_tray.stl"
-        _export_shape(tray, tray_path)
-        result["tray"] = str(tray_path)
+        tray_key = _part_key("tray", tray_w, tray_d, tray_thickness, floor + tray_z, tolerances)
+        if not _reuse_part(exports, "tray", tray_key, output_path):
+            tray = cq.Workplane(_XY).add(
+                _box(tray_w, tray_d, tray_thickness, (0, 0, floor + tray_z + tray_thickness / 2))
+            )
+            _submit_export(exports, "tray", tray, output_path, tray_key, tolerances)
 
     # --- 12. Generate bracket (optional) ---
     if bracket_part.enabled:
@@ -753,36 +1241,39 @@ def generate_enclosure(config: EnclosureConfig, output_dir: str = "./output") ->
         bracket_w = 30.0
         bracket_h = outer_h * 0.6
         bracket_t = bracket_wall
+        hole_r = hole_d / 2
 
-        back_plate = (
-            cq.Workplane("XY")
-            .box(bracket_w, bracket_t, bracket_h)
-            .translate((0, 0, bracket_h / 2))
-        )
+        bracket_key = _part_key("bracket", bracket_w, bracket_t, bracket_h, hole_r, tolerances)
+        if not _reuse_part(exports, "bracket", bracket_key, output_path):
+            back_plate = _box(bracket_w, bracket_t, bracket_h, (0, 0, bracket_h / 2))
 
-        flange_d = 12.0
-        flange = (
-            cq.Workplane("XY")
-            .box(bracket_w, flange_d, bracket_t)
-            .translate((0, flange_d / 2, bracket_h))
-        )
-        bracket = back_plate.union(flange)
+            flange_d = 12.0
+            flange = _box(bracket_w, flange_d, bracket_t, (0, flange_d / 2, bracket_h))
+            bracket = cq.Workplane(_XY).add(back_plate).union(flange)
 
-        hole_r = hole_d / 2
-        for hz in [bracket_h * 0.25, bracket_h * 0.75]:
-            hole = (
-                cq.Workplane("YZ")
-                .cylinder(bracket_t + 2, hole_r)
-                .translate((0, 0, hz))
-            )
-            try:
-                bracket = bracket.cut(hole)
-            except Exception:
-                pass
+            # A zero diameter means no holes; a zero-radius cylinder would only raise
+            if hole_r > 0:
+                holes = _cylinder_compound(
+                    [(0, 0, bracket_h * 0.25), (0, 0, bracket_h * 0.75)],
+                    bracket_t + 2, hole_r, direction=(1, 0, 0),
+                )
+                try:
+                    bracket = bracket.cut(holes)
+                except Exception as e:
+                    logger.warning("Could not cut bracket mounting holes: %s", e)
 
-        bracket_path = output_path / "enclosure_bracket.stl"
-        _export_shape(bracket, bracket_path)
-        result["bracket"] = str(bracket_path)
+            _submit_export(exports, "bracket", bracket, output_path, bracket_key, tolerances)
+
+    # --- 13. Wait for the exports, then combine them into one assembled 3MF ---
+    files = _collect_exports(exports)
+    assembly_path = _write_assembly_3mf(
+        files, output_path, outer_h, lid_t, snap_lid=config.lid_style == LidStyle.SNAP,
+    )
+    if assembly_path is not None:
+        files["assembly_3mf"] = str(assembly_path)
+    result = EnclosureResult(files, (inner_w, inner_d, inner_h))
+    if cache_key:
+        _store_result(cache_key, result)
 
-    print(f"[OK] Enclosure generated: {result}")
+    logger.info("Enclosure generated: %s", result)
     return result
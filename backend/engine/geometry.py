@@ -0,0 +1,142 @@
+"""
+ShellForge - Pure-Python geometry helpers (bbox reduction, footprint outlines).
+Kept free of CadQuery so they can be imported and tested without loading OCCT.
+"""
+import itertools
+import math
+from dataclasses import astuple
+
+import numpy as np
+
+from .models import FootprintConfig, Vector3
+
+
+# Sign pairs for the four corner screw positions
+_CORNERS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+# The same signs as a (4, 2) array, for placing all corners in one broadcast
+_CORNER_SIGNS = np.array(_CORNERS, dtype=np.float64)
+_CORNER_SIGNS.flags.writeable = False
+
+
+def _combined_bbox(mins: np.ndarray, maxs: np.ndarray) -> tuple:
+    """(bbox_min, bbox_max) as Vector3 over stacked (N, 3) min and max corners."""
+    lo = np.minimum.reduce(mins, axis=0)
+    hi = np.maximum.reduce(maxs, axis=0)
+    return Vector3(*lo.tolist()), Vector3(*hi.tolist())
+
+
+def compute_combined_bbox(components: list) -> tuple:
+    """
+    Compute the combined bounding box of all components.
+    Returns (bbox_min, bbox_max).
+    """
+    if not components:
+        raise ValueError("No components provided")
+
+    # One contiguous (N, 6) array of min|max corners, filled straight from the
+    # Vector3 tuples (no intermediate list) and reduced column-wise in C
+    boxes = np.fromiter(
+        itertools.chain.from_iterable(c.bbox_min + c.bbox_max for c in components),
+        dtype=np.float64, count=6 * len(components),
+    ).reshape(-1, 6)
+    return _combined_bbox(boxes[:, :3], boxes[:, 3:])
+
+
+def _footprint_points(outer_w: float, outer_d: float, fp: FootprintConfig) -> list:
+    """Corner points (x, y) of the 2D footprint outline for the enclosure base/lid."""
+    shape = fp.shape
+    hw, hd = outer_w / 2, outer_d / 2
+
+    if shape == "rectangle":
+        return [(-hw, -hd), (hw, -hd), (hw, hd), (-hw, hd)]
+
+    elif shape == "l_shape":
+        nw = fp.notch_w or outer_w * 0.4
+        nd = fp.notch_d or outer_d * 0.4
+        corner = fp.notch_corner
+        if corner == "top_right":
+            pts = [(-hw, -hd), (hw, -hd), (hw, hd - nd), (hw - nw, hd - nd), (hw - nw, hd), (-hw, hd)]
+        elif corner == "top_left":
+            pts = [(-hw, -hd), (hw, -hd), (hw, hd), (-hw + nw, hd), (-hw + nw, hd - nd), (-hw, hd - nd)]
+        elif corner == "bottom_right":
+            pts = [(-hw, -hd), (hw - nw, -hd), (hw - nw, -hd + nd), (hw, -hd + nd), (hw, hd), (-hw, hd)]
+        else:  # bottom_left
+            pts = [(-hw + nw, -hd), (-hw + nw, -hd + nd), (-hw, -hd + nd), (-hw, hd), (hw, hd), (hw, -hd)]
+        return pts
+
+    elif shape == "t_shape":
+        tw = fp.tab_w or outer_w * 0.4
+        td = fp.tab_d or outer_d * 0.3
+        side = fp.tab_side
+        if side == "top":
+            pts = [(-hw, -hd), (hw, -hd), (hw, hd - td), (tw / 2, hd - td), (tw / 2, hd),
+                   (-tw / 2, hd), (-tw / 2, hd - td), (-hw, hd - td)]
+        elif side == "bottom":
+            pts = [(-tw / 2, -hd), (tw / 2, -hd), (tw / 2, -hd + td), (hw, -hd + td),
+                   (hw, hd), (-hw, hd), (-hw, -hd + td), (-tw / 2, -hd + td)]
+        elif side == "right":
+            pts = [(-hw, -hd), (hw - td, -hd), (hw - td, -tw / 2), (hw, -tw / 2),
+                   (hw, tw / 2), (hw - td, tw / 2), (hw - td, hd), (-hw, hd)]
+        else:  # left
+            pts = [(-hw + td, -hd), (hw, -hd), (hw, hd), (-hw + td, hd),
+                   (-hw + td, tw / 2), (-hw, tw / 2), (-hw, -tw / 2), (-hw + td, -tw / 2)]
+        return pts
+
+    elif shape == "u_shape":
+        nw = fp.u_notch_w or outer_w * 0.5
+        nd = fp.u_notch_d or outer_d * 0.5
+        side = fp.u_open_side
+        if side == "top":
+            pts = [(-hw, -hd), (hw, -hd), (hw, hd), (nw / 2, hd), (nw / 2, hd - nd),
+                   (-nw / 2, hd - nd), (-nw / 2, hd), (-hw, hd)]
+        elif side == "bottom":
+            pts = [(-hw, -hd), (-nw / 2, -hd), (-nw / 2, -hd + nd), (nw / 2, -hd + nd),
+                   (nw / 2, -hd), (hw, -hd), (hw, hd), (-hw, hd)]
+        elif side == "right":
+            pts = [(-hw, -hd), (hw, -hd), (hw, -nw / 2), (hw - nd, -nw / 2),
+                   (hw - nd, nw / 2), (hw, nw / 2), (hw, hd), (-hw, hd)]
+        else:  # left
+            pts = [(-hw, -hd), (hw, -hd), (hw, hd), (-hw, hd), (-hw, nw / 2),
+                   (-hw + nd, nw / 2), (-hw + nd, -nw / 2), (-hw, -nw / 2)]
+        return pts
+
+    elif shape == "plus":
+        af = fp.arm_fraction
+        aw = outer_w * af / 2  # arm half-width
+        ad = outer_d * af / 2
+        pts = [
+            (-aw, -hd), (aw, -hd), (aw, -ad), (hw, -ad), (hw, ad),
+            (aw, ad), (aw, hd), (-aw, hd), (-aw, ad), (-hw, ad),
+            (-hw, -ad), (-aw, -ad)
+        ]
+        return pts
+
+    elif shape in ("hexagon", "octagon"):
+        sides = 6 if shape == "hexagon" else 8
+        # Same outline as Workplane.polygon(sides, r), which takes r as the
+        # circumscribed diameter
+        r = min(outer_w, outer_d) / 4
+        step = 2 * math.pi / sides
+        return [(r * math.cos(step * i), r * math.sin(step * i)) for i in range(sides)]
+
+    # Fallback
+    return [(-hw, -hd), (hw, -hd), (hw, hd), (-hw, hd)]
+
+
+# FootprintConfig fields each shape actually reads; the rest are ignored by it
+_FOOTPRINT_FIELDS = {
+    "l_shape": ("notch_w", "notch_d", "notch_corner"),
+    "t_shape": ("tab_w", "tab_d", "tab_side"),
+    "u_shape": ("u_notch_w", "u_notch_d", "u_open_side"),
+    "plus": ("arm_fraction",),
+}
+
+
+def _footprint_key(fp: FootprintConfig) -> tuple:
+    """
+    Hashable cache key for a footprint: astuple() with the fields its shape
+    ignores reset to their defaults, so stale settings of another shape (say
+    notch sizes left over on a rectangle) don't split the geometry caches.
+    """
+    relevant = {name: getattr(fp, name) for name in _FOOTPRINT_FIELDS.get(fp.shape, ())}
+    return astuple(FootprintConfig(shape=fp.shape, **relevant))
@@ -1,8 +1,9 @@
 """
 ShellForge - Data models for components and enclosure configuration.
 """
+from collections.abc import Mapping
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import NamedTuple, Optional
 from enum import Enum
 
 
@@ -51,8 +52,7 @@ class FootprintShape(str, Enum):
     OCTAGON = "octagon"
 
 
-@dataclass
-class Vector3:
+class Vector3(NamedTuple):
     x: float = 0.0
     y: float = 0.0
     z: float = 0.0
@@ -182,6 +182,13 @@ class EnclosureConfig:
     # Fillet radius (rounded edges), 0 = sharp
     fillet_radius: float = 1.5
 
+    # Mesh deflection for the exported STL/3MF. The parts are walls, boxes and
+    # small cylinders, so a coarse angular deflection keeps flat faces from
+    # being over-tessellated without visibly faceting the screw holes; raise
+    # either to trade surface quality for faster meshing and smaller files
+    export_tolerance: float = 0.1          # mm, linear deflection
+    export_angular_tolerance: float = 0.5  # rad
+
     # Enclosure style
     enclosure_style: str = "classic"  # "classic" | "vented" | "rounded" | "ribbed" | "minimal"
 
@@ -203,3 +210,23 @@ class EnclosureConfig:
     components: list = field(default_factory=list)
     cutouts: list = field(default_factory=list)
     custom_cutouts: list = field(default_factory=list)
+
+
+@dataclass
+class EnclosureResult(Mapping):
+    """
+    What an engine generated. Reads as a mapping of part name -> exported
+    file path ("base", "lid", "base_3mf", ...); the cavity size it built
+    around is kept apart in inner_bbox.
+    """
+    files: dict
+    inner_bbox: tuple  # (inner_w, inner_d, inner_h) in mm
+
+    def __getitem__(self, name):
+        return self.files[name]
+
+    def __iter__(self):
+        return iter(self.files)
+
+    def __len__(self):
+        return len(self.files)
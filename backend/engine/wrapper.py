@@ -7,53 +7,182 @@ The enclosure shape EMERGES from the component arrangement:
   - Diagonal components -> diagonal-fitting enclosure
   - T-shaped arrangement -> T-shaped enclosure
 """
+import functools
+import logging
 import math
 from pathlib import Path
-import cadquery as cq
-from shapely.geometry import Polygon, MultiPolygon, box as shapely_box
+
+import numpy as np
+import shapely
 from shapely.ops import unary_union
-from shapely.affinity import rotate as shapely_rotate, translate as shapely_translate
 
-from .models import EnclosureConfig, LidStyle, Vector3
+from .geometry import _CORNER_SIGNS
+from .models import EnclosureConfig, EnclosureResult, LidStyle, Vector3
+
+logger = logging.getLogger(__name__)
+
+
+# Corners of a unit rectangle centred on the origin, counter-clockwise like shapely's box()
+_UNIT_RECT = np.array([(0.5, -0.5), (0.5, 0.5), (-0.5, 0.5), (-0.5, -0.5)])
 
 
-def _component_footprint(comp_spec: dict) -> Polygon:
+def _component_table(components_spec: list) -> np.ndarray:
     """
-    Get the 2D footprint (shapely Polygon) of a component in world XY space.
-    Accounts for rotation around Z axis (rot_y in engineering = rotation in plan view).
+    (N, 9) float array of every component's fields, read from the spec dicts
+    in one pass. Columns: x, y, width, depth, rot_y, height, ground_z,
+    pcb_screw_diameter, is_pcb (0/1).
     """
-    cx = comp_spec.get("x", 0)
-    cy = comp_spec.get("y", 0)
-    w = comp_spec["width"]
-    d = comp_spec["depth"]
-    rot_y = comp_spec.get("rot_y", 0)  # degrees, rotation around vertical axis
+    return np.array([
+        (c.get("x", 0), c.get("y", 0), c["width"], c["depth"], c.get("rot_y", 0) or 0,
+         c["height"], c.get("ground_z", 0), c.get("pcb_screw_diameter", 3.0), bool(c.get("is_pcb")))
+        for c in components_spec
+    ], dtype=np.float64)
 
-    # Rectangle centered at origin
-    rect = shapely_box(-w / 2, -d / 2, w / 2, d / 2)
 
-    # Rotate around component center
-    if rot_y:
-        rect = shapely_rotate(rect, rot_y, origin=(0, 0), use_radians=False)
+def _component_footprints(x, y, w, d, rot) -> np.ndarray:
+    """
+    (N, 4, 2) world XY corners of every component's 2D footprint, in one
+    NumPy pass over the _component_table columns. Accounts for rotation
+    around Z axis (rot_y in engineering = rotation in plan view, degrees,
+    counter-clockwise about the centre).
+    """
+    local = _UNIT_RECT * np.stack([w, d], axis=1)[:, None, :]
+    theta = np.radians(rot)
+    cos, sin = np.cos(theta), np.sin(theta)
+    # Snap the rounding residue of multiples of 90 degrees, as shapely.affinity.rotate does
+    cos[np.abs(cos) < 2.5e-16] = 0.0
+    sin[np.abs(sin) < 2.5e-16] = 0.0
+    cos, sin = cos[:, None], sin[:, None]
 
-    # Translate to world position
-    rect = shapely_translate(rect, cx, cy)
-    return rect
+    lx, ly = local[..., 0], local[..., 1]
+    return np.stack([cos * lx - sin * ly + x[:, None], sin * lx + cos * ly + y[:, None]], axis=-1)
 
 
-def _shapely_to_cq_wire(polygon, workplane="XY"):
-    """Convert a shapely Polygon exterior to a closed CadQuery wire on the given workplane."""
-    coords = list(polygon.exterior.coords)[:-1]  # drop duplicate last point
+def _bridge_footprints(union_footprint):
+    """
+    Join the separate islands of a footprint union with rectangular bridges
+    instead of taking its convex hull. Islands are linked along a minimum
+    spanning tree of their bounding-box gaps; each bridge spans the gap
+    between the two boxes (and their shared extent, where they overlap on
+    one axis), or is a strip along the shortest line for diagonal
+    neighbours. Falls back to the convex hull if the result is still split.
+    """
+    islands = list(union_footprint.geoms)
+    bounds = shapely.bounds(islands)  # (K, 4): minx, miny, maxx, maxy
+    lo, hi = bounds[:, :2], bounds[:, 2:]
+
+    # Pairwise box gaps: per axis, the larger min minus the smaller max
+    inner_lo = np.maximum(lo[:, None, :], lo[None, :, :])
+    inner_hi = np.minimum(hi[:, None, :], hi[None, :, :])
+    gap = np.hypot(*np.clip(inner_lo - inner_hi, 0, None).transpose(2, 0, 1))
+
+    # Prim's algorithm over the K islands
+    linked = np.zeros(len(islands), dtype=bool)
+    linked[0] = True
+    bridges = []
+    while not linked.all():
+        dist = np.where(linked[:, None] & ~linked[None, :], gap, np.inf)
+        i, j = np.unravel_index(np.argmin(dist), dist.shape)
+        a, b = inner_lo[i, j], inner_hi[i, j]
+        if (a <= b).any():
+            bridges.append(shapely.box(*np.minimum(a, b), *np.maximum(a, b)))
+        else:
+            # Diagonal neighbours: a box between the near corners would only
+            # touch them at a point, so run a square-capped strip instead
+            width = (hi - lo)[[i, j]].min()
+            line = shapely.shortest_line(islands[i], islands[j])
+            bridges.append(line.buffer(width / 2, cap_style="square"))
+        linked[j] = True
+
+    bridged = unary_union([union_footprint, *bridges])
+    if bridged.geom_type == "MultiPolygon":
+        return union_footprint.convex_hull
+    return bridged
+
+
+@functools.lru_cache(maxsize=32)
+def _footprint_union(columns: bytes):
+    """
+    Union of all component footprints, islands bridged into one polygon.
+    Keyed on the raw bytes of the x, y, width, depth, rot_y columns, so
+    regenerating with only enclosure settings changed (padding, walls,
+    fillets) skips the union; shapely geometries are immutable, so the
+    cached one is safe to share.
+    """
+    x, y, w, d, rot = np.frombuffer(columns).reshape(5, -1)
+    union_footprint = unary_union(shapely.polygons(_component_footprints(x, y, w, d, rot)))
+
+    # Handle MultiPolygon (disconnected components) -- bridge the islands together
+    if union_footprint.geom_type == "MultiPolygon":
+        union_footprint = _bridge_footprints(union_footprint)
+    return union_footprint
+
+
+@functools.lru_cache(maxsize=32)
+def _polygon_wire(wkb: bytes, workplane: str):
+    """
+    Closed CadQuery wire along a WKB polygon's exterior, cached so the base
+    and lid only convert their outline once. Only hand out copies (see
+    _shapely_to_cq_wire): meshing a solid writes onto its edges.
+    """
+    import cadquery as cq
+
+    coords = shapely.get_coordinates(shapely.from_wkb(wkb).exterior)[:-1]  # drop duplicate last point
     if len(coords) < 3:
         raise ValueError("Polygon has too few points")
-    pts = [(float(x), float(y)) for x, y in coords]
-    return cq.Workplane(workplane).polyline(pts).close()
+    # Plane-local XY -> world in one product, then one polygon wire (no
+    # per-vertex Workplane bookkeeping as with polyline)
+    plane = cq.Plane.named(workplane)
+    axes = np.array([plane.xDir.toTuple(), plane.yDir.toTuple()])
+    pts = coords @ axes + plane.origin.toTuple()
+    return cq.Wire.makePolygon(pts.tolist(), close=True)
+
+
+def _shapely_to_cq_wire(polygon, workplane="XY"):
+    """Convert a shapely Polygon exterior to a closed CadQuery wire on the given workplane."""
+    import cadquery as cq
+
+    # Extruding consumes a workplane's pending wires, so hand out a fresh
+    # workplane each time, around a copy of the cached wire: solids extruded
+    # from one shared wire would share its edges, and BRepMesh stores each
+    # part's triangulation on them (the lid is meshed on an export thread
+    # while the base is still being built)
+    return cq.Workplane(workplane).add(_polygon_wire(polygon.wkb, workplane).copy()).toPending()
+
+
+def _offset_outline(footprint, distance: float, radius: float, quad_segs: int = 8):
+    """
+    Offset a footprint outward by distance with square corners, rounding its
+    convex corners to radius (0 keeps them square) with quad_segs segments
+    per quarter circle.
+
+    When radius <= distance this is a mitred offset of distance - radius
+    followed by a round offset of radius: the same outline as the
+    buffer(-r).buffer(r) trick applied to the full offset, in two buffer
+    calls instead of three. Larger radii erode features away, so they still
+    go through the full trick.
+    """
+    if radius <= 0:
+        return footprint.buffer(distance, cap_style=3, join_style=2)
+    if radius <= distance:
+        return (
+            footprint
+            .buffer(distance - radius, cap_style=3, join_style=2)
+            .buffer(radius, quad_segs=quad_segs, cap_style=1, join_style=1)
+        )
+    return (
+        footprint
+        .buffer(distance, cap_style=3, join_style=2)
+        .buffer(-radius, cap_style=3, join_style=2)
+        .buffer(radius, quad_segs=quad_segs, cap_style=1, join_style=1)
+    )
 
 
 def generate_wrapper_enclosure(
     components_spec: list,
     config: EnclosureConfig,
     output_dir: str = "./output"
-) -> dict:
+) -> EnclosureResult:
     """
     Generate a true geometric wrapper enclosure.
 
@@ -67,25 +196,27 @@ def generate_wrapper_enclosure(
         output_dir: Directory to write output STL/3MF files
 
     Returns:
-        dict with keys 'base', optionally 'base_3mf', 'lid', 'lid_3mf'
+        EnclosureResult with keys 'base', optionally 'base_3mf', 'lid',
+        'lid_3mf', and .inner_bbox: the bounding box (inner_w, inner_d,
+        inner_h) of the actual cavity, i.e. of the padded footprint union
     """
     if not components_spec:
         raise ValueError("No components provided")
 
+    import cadquery as cq
+
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
 
-    # --- 1. Build 2D footprint union ---
-    footprints = [_component_footprint(c) for c in components_spec]
-    union_footprint = unary_union(footprints)
+    table = _component_table(components_spec)
+    x, y, w, d, rot, h, gz, screw_d, is_pcb = table.T
 
-    # Handle MultiPolygon (disconnected components) -- use convex hull to connect them
-    if union_footprint.geom_type == "MultiPolygon":
-        union_footprint = union_footprint.convex_hull
+    # --- 1. Build 2D footprint union ---
+    union_footprint = _footprint_union(table[:, :5].T.tobytes())
 
     # --- 2. Compute height range ---
-    min_z = min(c.get("ground_z", 0) for c in components_spec)
-    max_z = max(c.get("ground_z", 0) + c["height"] for c in components_spec)
+    min_z = float(gz.min())
+    max_z = float((gz + h).max())
     inner_h = (max_z - min_z) + config.padding_z * 2
     outer_h = inner_h + config.floor_thickness
 
@@ -93,153 +224,108 @@ def generate_wrapper_enclosure(
     pad = max(config.padding_x, config.padding_y)  # use max for uniform offset
     wall = config.wall_thickness
 
-    # Inner cavity footprint (components + padding) -- square corners (join_style=2, cap_style=3)
-    cavity_poly = union_footprint.buffer(pad, cap_style=3, join_style=2)
-    # Outer shell footprint (cavity + walls)
-    outer_poly = cavity_poly.buffer(wall, cap_style=3, join_style=2)
-
-    # Apply fillet if configured (buffer/debuffer trick)
-    if config.fillet_radius > 0:
-        r = config.fillet_radius
-        outer_poly = (
-            outer_poly
-            .buffer(-r, cap_style=3, join_style=2)
-            .buffer(r, cap_style=1, join_style=1)
-        )
-        cavity_poly = (
-            cavity_poly
-            .buffer(-r / 2, cap_style=3, join_style=2)
-            .buffer(r / 2, cap_style=1, join_style=1)
-        )
+    # Inner cavity footprint (components + padding) and outer shell footprint
+    # (cavity + walls), with the fillet radius rounding their convex corners.
+    # 8 segments per quarter keep the outer arcs' chord error under 0.005 r;
+    # the cavity's hidden half-radius arcs get 4 (under 0.02 r). Both are far
+    # below the export tolerance, where shapely's 16 only added facets
+    r = config.fillet_radius
+    cavity_poly = _offset_outline(union_footprint, pad, r / 2, quad_segs=4)
+    outer_poly = _offset_outline(union_footprint, pad + wall, r)
 
-    # --- 4. Build CadQuery base shell ---
-    # Outer solid extrusion
-    outer_wire = _shapely_to_cq_wire(outer_poly)
-    base = outer_wire.extrude(outer_h)
-
-    # Subtract inner cavity (from top, keeping floor intact)
-    cavity_wire = _shapely_to_cq_wire(cavity_poly)
-    cavity_solid = cavity_wire.extrude(inner_h).translate((0, 0, config.floor_thickness))
-    base = base.cut(cavity_solid)
-
-    # --- 5. PCB standoffs ---
-    if config.pcb_standoffs_enabled:
-        for comp in components_spec:
-            if comp.get("is_pcb") and comp.get("ground_z", 0) > 0:
-                boss_r = comp.get("pcb_screw_diameter", 3.0) * 1.25
-                screw_r = comp.get("pcb_screw_diameter", 3.0) / 2
-                gz = comp.get("ground_z", 0)
-                cx = comp.get("x", 0)
-                cy = comp.get("y", 0)
-                w_comp = comp["width"]
-                d_comp = comp["depth"]
-                inset = boss_r * 1.5
-                for sx, sy in [(1, 1), (1, -1), (-1, 1), (-1, -1)]:
-                    bx = cx + sx * (w_comp / 2 - inset)
-                    by = cy + sy * (d_comp / 2 - inset)
-                    boss = (
-                        cq.Workplane("XY")
-                        .cylinder(gz, boss_r)
-                        .translate((bx, by, gz / 2))
-                    )
-                    hole = (
-                        cq.Workplane("XY")
-                        .cylinder(gz + 1, screw_r)
-                        .translate((bx, by, gz / 2))
-                    )
-                    base = base.union(boss).cut(hole)
-
-    # --- 6. Connector and custom cutouts ---
-    # Import cut functions from generator (avoids circular import by deferring)
-    from .generator import _apply_connector_cutout, _apply_custom_cutout
-
-    # Compute outer bounding box for cutout positioning
+    # Outer bounding box, for lid screw and cutout positioning
     bb = outer_poly.bounds  # (minx, miny, maxx, maxy)
     outer_w = bb[2] - bb[0]
     outer_d = bb[3] - bb[1]
     inner_w = outer_w - wall * 2
     inner_d = outer_d - wall * 2
+    center_x = (bb[0] + bb[2]) / 2
+    center_y = (bb[1] + bb[3]) / 2
 
-    inner_size = Vector3(inner_w, inner_d, inner_h)
-    inner_center = Vector3(
-        (bb[0] + bb[2]) / 2,
-        (bb[1] + bb[3]) / 2,
-        config.floor_thickness + inner_h / 2,
-    )
+    # Import helpers from generator (avoids circular import by deferring)
+    from .generator import _apply_cutouts, _collect_exports, _cylinder_compound, _submit_export
 
-    for cutout in config.cutouts:
-        try:
-            base = _apply_connector_cutout(base, cutout, inner_size, wall, inner_center)
-        except Exception as e:
-            print(f"[WARN] Connector cutout skipped: {e}")
+    exports = {}
+    tolerances = (config.export_tolerance, config.export_angular_tolerance)
 
-    for custom in config.custom_cutouts:
-        try:
-            base = _apply_custom_cutout(base, custom, inner_size, wall, inner_center)
-        except Exception as e:
-            print(f"[WARN] Custom cutout skipped: {e}")
-
-    # --- 7. Export base ---
-    base_path = output_path / "enclosure_base.stl"
-    cq.exporters.export(base, str(base_path))
-    result = {"base": str(base_path)}
-
-    # Try 3MF export (may not be supported in all CadQuery builds)
-    try:
-        base_3mf = output_path / "enclosure_base.3mf"
-        cq.exporters.export(base, str(base_3mf))
-        result["base_3mf"] = str(base_3mf)
-    except Exception:
-        pass
-
-    # --- 8. Generate lid ---
+    # --- 4. Generate lid ---
+    # Built first, so it is meshed and written in the background while the
+    # base's booleans run
     if config.lid_style != LidStyle.NONE:
-        # Lid uses outer footprint shape
+        # Lid uses outer footprint shape; its corners are already rounded by
+        # the buffer trick above, so no 3D fillet pass is needed
         lid_wire = _shapely_to_cq_wire(outer_poly)
         lid = lid_wire.extrude(config.lid_thickness)
 
-        # Fillet lid vertical edges if requested
-        if config.fillet_radius > 0:
-            try:
-                lid = lid.edges("|Z").fillet(config.fillet_radius)
-            except Exception:
-                pass
-
         # Screw holes in lid
         if config.lid_style == LidStyle.SCREWS:
             boss_r = config.boss_diameter / 2
             screw_r = config.screw_diameter / 2
             inset_val = boss_r + wall
-            cx_center = (bb[0] + bb[2]) / 2
-            cy_center = (bb[1] + bb[3]) / 2
-            for sx, sy in [(1, 1), (1, -1), (-1, 1), (-1, -1)]:
-                bx = cx_center + sx * (inner_w / 2 - inset_val)
-                by = cy_center + sy * (inner_d / 2 - inset_val)
-                hole = (
-                    cq.Workplane("XY")
-                    .cylinder(config.lid_thickness + 1, screw_r)
-                    .translate((bx, by, config.lid_thickness / 2))
-                )
-                lid = lid.cut(hole)
-
-        lid_path = output_path / "enclosure_lid.stl"
-        cq.exporters.export(lid, str(lid_path))
-        result["lid"] = str(lid_path)
+            half = (inner_w / 2 - inset_val, inner_d / 2 - inset_val)
+            corners = (center_x, center_y) + _CORNER_SIGNS * half
+            centers = [(cx, cy, config.lid_thickness / 2) for cx, cy in corners.tolist()]
+            lid = lid.cut(_cylinder_compound(centers, config.lid_thickness + 1, screw_r))
+
+        _submit_export(exports, "lid", lid, output_path, tolerances=tolerances)
+
+    # --- 5. Build CadQuery base shell ---
+    # Outer solid extrusion
+    outer_wire = _shapely_to_cq_wire(outer_poly)
+    base = outer_wire.extrude(outer_h)
+
+    # Inner cavity (from top, keeping floor intact); it is subtracted together
+    # with the screw holes and cutouts in step 7, so the base only goes
+    # through one boolean
+    cavity_wire = _shapely_to_cq_wire(cavity_poly)
+    cavity = cavity_wire.extrude(inner_h).translate((0, 0, config.floor_thickness))
+
+    # --- 6. PCB standoffs ---
+    # The bosses lie inside the outer solid, so instead of adding them to the
+    # hollowed base they are carved out of the (much simpler) cavity:
+    # (outer - cavity) | bosses == outer - (cavity - bosses)
+    holes = []
+    pcb = (is_pcb > 0) & (gz > 0)
+    if config.pcb_standoffs_enabled and pcb.any():
+        # Boss corners for every PCB at once: 4 per board, inset 1.5 boss radii
+        boss_r = screw_d[pcb] * 1.25
+        half = np.stack([w, d], axis=1)[pcb] / 2 - boss_r[:, None] * 1.5
+        corners = np.stack([x, y], axis=1)[pcb][:, None, :] + half[:, None, :] * _CORNER_SIGNS
+
+        bosses, holes = [], []
+        for sd, z, xy in zip(screw_d[pcb].tolist(), gz[pcb].tolist(), corners.tolist()):
+            centers = [(cx, cy, z / 2) for cx, cy in xy]
+            bosses.append(_cylinder_compound(centers, z, sd * 1.25))
+            holes.append(_cylinder_compound(centers, z + 1, sd / 2))
 
         try:
-            lid_3mf = output_path / "enclosure_lid.3mf"
-            cq.exporters.export(lid, str(lid_3mf))
-            result["lid_3mf"] = str(lid_3mf)
-        except Exception:
-            pass
+            cavity = cavity.cut(cq.Workplane("XY").add(bosses))
+        except Exception as e:
+            logger.warning("Batched PCB bosses failed (%s), adding them per component", e)
+            placed = []
+            for boss, hole in zip(bosses, holes):
+                try:
+                    cavity = cavity.cut(boss)
+                    placed.append(hole)
+                except Exception as e:
+                    logger.warning("PCB bosses skipped: %s", e)
+            holes = placed  # no screw hole for bosses that aren't there
+
+    # --- 7. Cavity, screw holes, connector and custom cutouts ---
+    inner_size = Vector3(inner_w, inner_d, inner_h)
+    inner_center = Vector3(center_x, center_y, config.floor_thickness + inner_h / 2)
 
-    # Report dimensions (no emoji - Windows cp1252 safe)
-    outer_bounds = outer_poly.bounds
-    print(
-        f"[OK] Wrapper enclosure: "
-        f"{outer_bounds[2]-outer_bounds[0]:.1f} x "
-        f"{outer_bounds[3]-outer_bounds[1]:.1f} x "
-        f"{outer_h:.1f} mm"
+    base = _apply_cutouts(
+        base, config.cutouts, config.custom_cutouts,
+        inner_size, wall, inner_center, extra_cutters=[*cavity.vals(), *holes],
+        planar_walls=False,  # walls follow the footprint, not the bbox
     )
-    print(f"[OK] Output: {result}")
+    _submit_export(exports, "base", base, output_path, tolerances=tolerances)
+
+    # --- 8. Wait for the exports ---
+    result = EnclosureResult(_collect_exports(exports), (inner_w, inner_d, inner_h))
+
+    # Report dimensions (no emoji - Windows cp1252 safe)
+    logger.info("Wrapper enclosure: %.1f x %.1f x %.1f mm", outer_w, outer_d, outer_h)
+    logger.info("Output: %s", result)
     return result
@@ -0,0 +1,163 @@
+"""
+ShellForge - Export tests: 3MF files written from the parts' STL meshes,
+and reuse of already exported parts.
+
+Run: python -m pytest tests/test_export.py
+"""
+import sys
+import os
+import zipfile
+import xml.etree.ElementTree as ET
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cadquery as cq
+import numpy as np
+import pytest
+import trimesh
+
+from backend.engine import generator
+from backend.engine.bbox_only import generate_from_manual_bbox
+from backend.engine.generator import _write_3mf, generate_enclosure
+from backend.engine.models import (
+    Component, ConnectorCutout, ConnectorType, EnclosureConfig, LidStyle, PartConfig, WallFace,
+)
+
+_NS = {"m": "http://schemas.microsoft.com/3dmanufacturing/core/2015/02"}
+
+
+def _read_3mf(path):
+    """[(name, vertices (N, 3), triangles (M, 3), transform or None)] per build item."""
+    with zipfile.ZipFile(path) as zf:
+        root = ET.fromstring(zf.read("3D/3dmodel.model"))
+    objects = {}
+    for obj in root.iterfind("m:resources/m:object", _NS):
+        vertices = np.array([
+            [float(v.get(axis)) for axis in "xyz"]
+            for v in obj.iterfind("m:mesh/m:vertices/m:vertex", _NS)
+        ])
+        triangles = np.array([
+            [int(t.get(k)) for k in ("v1", "v2", "v3")]
+            for t in obj.iterfind("m:mesh/m:triangles/m:triangle", _NS)
+        ])
+        objects[obj.get("id")] = (obj.get("name"), vertices, triangles)
+    return [
+        (*objects[item.get("objectid")], item.get("transform"))
+        for item in root.iterfind("m:build/m:item", _NS)
+    ]
+
+
+def _placed(vertices, transform):
+    """Vertices moved by a 3MF "m00 m01 ... m32" transform (row vectors: p @ M + t)."""
+    if transform is None:
+        return vertices
+    m = np.array(transform.split(), dtype=float).reshape(4, 3)
+    return vertices @ m[:3] + m[3]
+
+
+def test_part_3mf_matches_stl(tmp_path):
+    """Each part's 3MF holds the same welded mesh as its STL."""
+    components = [{"name": "Board", "width": 50, "depth": 30, "height": 12, "x": 0, "y": 0}]
+    result = generate_from_manual_bbox(components, EnclosureConfig(), str(tmp_path))
+
+    for part in ("base", "lid"):
+        [(name, vertices, triangles, transform)] = _read_3mf(result[f"{part}_3mf"])
+        stl = trimesh.load(result[part])
+        assert name == f"enclosure_{part}"
+        assert transform is None
+        assert len(vertices) == len(stl.vertices), part
+        assert len(triangles) == len(stl.faces), part
+        assert np.allclose(np.sort(vertices, axis=0), np.sort(stl.vertices, axis=0)), part
+
+
+def test_3mf_escapes_object_name(tmp_path):
+    """Object names are written as escaped XML attributes."""
+    name = 'Lid "v2" <USB & HDMI>'
+    vertices = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype=np.float32)
+    triangles = np.array([[0, 2, 1], [0, 1, 3], [0, 3, 2], [1, 2, 3]])
+    path = tmp_path / "named.3mf"
+    _write_3mf(path, [(name, vertices, triangles, None)])
+
+    [(read_name, read_vertices, read_triangles, _)] = _read_3mf(path)
+    assert read_name == name
+    assert np.array_equal(read_vertices, vertices)
+    assert np.array_equal(read_triangles, triangles)
+
+
+@pytest.mark.parametrize("lid_style", [LidStyle.SCREWS, LidStyle.SNAP])
+def test_assembly_3mf_places_parts(tmp_path, monkeypatch, lid_style):
+    """
+    enclosure.3mf holds every part's STL mesh once, with the lid placed on the
+    base (a snap lid flipped, rim down) and the bracket 10mm beside it.
+    """
+    monkeypatch.setattr(generator, "RESULT_CACHE_DIR", "")
+    step_path = tmp_path / "board.step"
+    cq.exporters.export(cq.Workplane().box(30, 40, 10), str(step_path))
+    config = EnclosureConfig(lid_style=lid_style, components=[Component("board", str(step_path))])
+    config.parts["tray"] = PartConfig()
+    config.parts["bracket"] = PartConfig()
+
+    result = generate_enclosure(config, str(tmp_path / "out"))
+    placed = {}
+    for name, vertices, triangles, transform in _read_3mf(result["assembly_3mf"]):
+        part = name.removeprefix("ShellForge ")
+        stl = trimesh.load(result[part])
+        assert len(vertices) == len(stl.vertices), part
+        assert len(triangles) == len(stl.faces), part
+        placed[part] = _placed(vertices, transform)
+    assert sorted(placed) == ["base", "bracket", "lid", "tray"]
+
+    rim = placed["base"][:, 2].max()
+    lid_z = placed["lid"][:, 2]
+    if lid_style == LidStyle.SNAP:
+        # Plate on the rim, snap rim hanging down into the cavity
+        assert np.isclose(lid_z.max(), rim + config.lid_thickness)
+        assert lid_z.min() < rim
+    else:
+        assert np.isclose(lid_z.min(), rim)
+    assert np.isclose(placed["bracket"][:, 0].min(), placed["base"][:, 0].max() + 10.0)
+    # The tray is already in place inside the base
+    assert (placed["tray"].min(axis=0) > placed["base"].min(axis=0)).all()
+    assert (placed["tray"].max(axis=0) < placed["base"].max(axis=0)).all()
+
+
+def test_cache_hit_keeps_part_reuse(tmp_path, monkeypatch):
+    """
+    Generate, regenerate unchanged (a result cache hit), then move a cutout:
+    the restored lid, tray and bracket are still reused, only the base is
+    exported again.
+    """
+    monkeypatch.setattr(generator, "RESULT_CACHE_DIR", str(tmp_path / "cache"))
+    exported = []
+    export_part = generator._export_part
+
+    def recording_export(shape, stl_path, *args):
+        exported.append(stl_path.stem)
+        export_part(shape, stl_path, *args)
+
+    monkeypatch.setattr(generator, "_export_part", recording_export)
+
+    step_path = tmp_path / "board.step"
+    cq.exporters.export(cq.Workplane().box(30, 40, 10), str(step_path))
+    config = EnclosureConfig(
+        components=[Component("board", str(step_path))],
+        cutouts=[ConnectorCutout(ConnectorType.USB_C, WallFace.FRONT)],
+    )
+    config.parts["tray"] = PartConfig()
+    config.parts["bracket"] = PartConfig()
+    out = str(tmp_path / "out")
+
+    generate_enclosure(config, out)
+    assert sorted(exported) == [
+        "enclosure_base", "enclosure_bracket", "enclosure_lid", "enclosure_tray",
+    ]
+
+    exported.clear()
+    generate_enclosure(config, out)
+    assert exported == [], "unchanged design should come from the result cache"
+
+    config.cutouts = [ConnectorCutout(ConnectorType.USB_C, WallFace.FRONT, offset_x=5)]
+    result = generate_enclosure(config, out)
+    assert exported == ["enclosure_base"]
+    assert sorted(result) == [
+        "assembly_3mf", "base", "base_3mf", "bracket", "lid", "lid_3mf", "tray",
+    ]
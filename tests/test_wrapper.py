@@ -0,0 +1,109 @@
+"""
+ShellForge - Wrapper engine tests: footprint bridging and repeated generation.
+
+Run: python -m pytest tests/test_wrapper.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import shapely
+import trimesh
+from shapely.ops import unary_union
+
+from backend.engine.models import (
+    ConnectorCutout, ConnectorType, EnclosureConfig, LidStyle, WallFace,
+)
+from backend.engine.wrapper import (
+    _bridge_footprints,
+    _component_footprints,
+    _component_table,
+    generate_wrapper_enclosure,
+)
+
+
+def _islands(components):
+    """Unbridged union of the components' footprints."""
+    x, y, w, d, rot = _component_table(components)[:, :5].T
+    return unary_union(shapely.polygons(_component_footprints(x, y, w, d, rot)))
+
+
+def test_bridge_side_by_side_islands():
+    """Two islands that overlap in Y are joined by a corridor, not their hull."""
+    union = _islands([
+        {"width": 20, "depth": 20, "height": 5, "x": 0, "y": 0},
+        {"width": 20, "depth": 10, "height": 5, "x": 40, "y": 3},
+    ])
+    assert union.geom_type == "MultiPolygon"
+
+    bridged = _bridge_footprints(union)
+    assert bridged.geom_type == "Polygon"
+    assert bridged.contains(union)
+    assert bridged.area < union.convex_hull.area
+
+
+def test_bridge_diagonal_islands():
+    """Islands that share no X or Y extent are joined by a diagonal strip."""
+    union = _islands([
+        {"width": 20, "depth": 20, "height": 5, "x": 0, "y": 0},
+        {"width": 10, "depth": 10, "height": 5, "x": 40, "y": 40},
+    ])
+    assert union.geom_type == "MultiPolygon"
+
+    bridged = _bridge_footprints(union)
+    assert bridged.geom_type == "Polygon"
+    assert bridged.contains(union)
+    assert bridged.area < union.convex_hull.area
+
+
+def test_wrapper_repeated_generation_is_watertight(tmp_path):
+    """
+    The lid is meshed on an export thread while the base is still being
+    built; every run of the same design must give the same closed meshes.
+    """
+    components = [
+        {"name": "PCB", "width": 60, "depth": 40, "height": 10, "x": 0, "y": 0,
+         "is_pcb": True, "ground_z": 5},
+        {"name": "Battery", "width": 20, "depth": 50, "height": 15, "x": 40, "y": 20},
+    ]
+    config = EnclosureConfig(lid_style=LidStyle.SCREWS)
+
+    volumes = set()
+    for run in range(12):
+        result = generate_wrapper_enclosure(components, config, str(tmp_path / f"run{run}"))
+        base = trimesh.load(result["base"])
+        lid = trimesh.load(result["lid"])
+        assert base.is_watertight, f"base mesh not watertight on run {run}"
+        assert lid.is_watertight, f"lid mesh not watertight on run {run}"
+        volumes.add((round(base.volume, 3), round(lid.volume, 3)))
+
+    assert len(volumes) == 1, f"meshes differ between runs: {sorted(volumes)}"
+
+
+def _cutout_volume(components, cutout, tmp_path):
+    """Volume a connector cutout removes from a wrapper base."""
+    volumes = []
+    for cutouts in ([], [cutout]):
+        config = EnclosureConfig(lid_style=LidStyle.NONE, cutouts=cutouts)
+        result = generate_wrapper_enclosure(components, config, str(tmp_path / f"cut{len(cutouts)}"))
+        volumes.append(trimesh.load(result["base"]).volume)
+    return volumes[0] - volumes[1]
+
+
+def test_cutout_through_set_back_wall(tmp_path):
+    """
+    A side wall set back from the bounding-box plane (a narrower component
+    next to a wider one) is still cut all the way through, not pocketed.
+    """
+    cutout = ConnectorCutout(ConnectorType.USB_C, WallFace.RIGHT, offset_x=10)
+    flush = _cutout_volume([
+        {"name": "A", "width": 40, "depth": 20, "height": 15, "x": 0, "y": 0},
+        {"name": "B", "width": 40, "depth": 20, "height": 15, "x": 0, "y": 20},
+    ], cutout, tmp_path / "flush")
+    set_back = _cutout_volume([
+        {"name": "A", "width": 40, "depth": 20, "height": 15, "x": 0, "y": 0},
+        {"name": "B", "width": 35, "depth": 20, "height": 15, "x": 0, "y": 20},
+    ], cutout, tmp_path / "set_back")
+
+    assert flush > 0
+    assert abs(set_back - flush) < 0.05 * flush, f"hole not through: {set_back:.1f} vs {flush:.1f} mm3"